@@ -0,0 +1,72 @@
+"""
+Command line transcoder between the uncompressed raw thermal capture format (.tcr) and the compressed, seekable
+thermal archive format (.tca).
+"""
+
+import os
+from argparse import ArgumentParser
+from defaults.values import *
+from helpers.archiveHelper import COMPRESSORS, COMPRESSION_LEVELS, ArchiveReader, TranscodeStats, \
+    transcode_to_archive, transcode_to_raw
+
+# Initialize argument parsing
+parser = ArgumentParser(description="Compress raw thermal recordings into seekable archives and back.")
+subparsers = parser.add_subparsers(dest="command", required=True)
+
+compress_parser = subparsers.add_parser("compress", help="Compress raw recordings (.tcr) into archives (.tca)")
+compress_parser.add_argument("inputs", nargs="+", help="Raw recordings to compress")
+compress_parser.add_argument("--keyframe-interval", type=int, default=ARCHIVE_KEYFRAME_INTERVAL,
+                             help=f"Frames per GOP. Default is {ARCHIVE_KEYFRAME_INTERVAL}.")
+compress_parser.add_argument("--compressor", choices=list(COMPRESSORS), default=ARCHIVE_COMPRESSOR,
+                             help=f"Standard library compressor to use. Default is {ARCHIVE_COMPRESSOR}.")
+compress_parser.add_argument("--level", type=int, default=ARCHIVE_COMPRESSION_LEVEL,
+                             help=f"Compression level (0-9, 1-9 for bz2). Default is {ARCHIVE_COMPRESSION_LEVEL}.")
+compress_parser.add_argument("--verify", action="store_true",
+                             help="Decode the archive again, compare it to the source and report decode speed")
+compress_parser.add_argument("--delete-source", action="store_true",
+                             help="Delete each raw recording after it was archived and verified")
+
+decompress_parser = subparsers.add_parser("decompress", help="Expand archives (.tca) back into raw recordings (.tcr)")
+decompress_parser.add_argument("inputs", nargs="+", help="Archives to expand")
+
+info_parser = subparsers.add_parser("info", help="Show details about archives")
+info_parser.add_argument("inputs", nargs="+", help="Archives to inspect")
+
+args = parser.parse_args()
+if args.command == "compress" and args.level not in COMPRESSION_LEVELS[args.compressor]:
+    levels = COMPRESSION_LEVELS[args.compressor]
+    parser.error(f"--level must be {levels.start}-{levels.stop - 1} for {args.compressor}, got {args.level}")
+
+
+def main():
+    for path in args.inputs:
+        base, _ = os.path.splitext(path)
+        print(path)
+
+        if args.command == "compress":
+            stats = transcode_to_archive(
+                path,
+                base + ARCHIVE_EXTENSION,
+                keyframe_interval=args.keyframe_interval,
+                compressor=args.compressor,
+                level=args.level,
+                verify=args.verify or args.delete_source)
+            if args.delete_source:
+                os.remove(path)
+        elif args.command == "decompress":
+            stats = transcode_to_raw(path, base + RAW_RECORDING_EXTENSION)
+        else:
+            with ArchiveReader(path) as archive:
+                print(f'Resolution: {archive.width}x{archive.height} @ {archive.fps} FPS\n'
+                      f'Duration: {archive.frame_count / archive.fps:.1f} s\n'
+                      f'Keyframe interval: {archive.keyframe_interval}\n'
+                      f'Compressor: {archive.compressor} (level {archive.level})')
+                stats = TranscodeStats(archive.frame_count, archive.frame_count * archive.width * archive.height * 2,
+                                       archive.compressed_bytes)
+
+        print(f'{stats}\n')
+
+
+# Basic main call
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""
+Batch analytics over recorded sessions (.tcr/.tca). Recomputes the frame statistics, hotspot tracks, region of
+interest series and alarm evaluations for many recordings in parallel, one process per session, and writes one
+columnar .npz file per session. Sessions already analyzed with the same parameters are skipped, so an interrupted run
+can simply be started again.
+"""
+
+import os
+import sys
+import time
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from defaults.values import *
+from helpers.batchHelper import analyze_session, get_output_path, parse_roi
+
+# Initialize argument parsing
+parser = ArgumentParser(description="Analyze recorded sessions in parallel.")
+parser.add_argument("inputs", nargs="+", help="Recordings (.tcr/.tca), or directories to search for them")
+parser.add_argument("--output", type=str, default=BATCH_OUTPUT_PATH,
+                    help=f"Directory for the results. Default is {BATCH_OUTPUT_PATH}.")
+parser.add_argument("--workers", type=int, default=None, help="Worker processes. Default is one per CPU.")
+parser.add_argument("--block-frames", type=int, default=BATCH_BLOCK_FRAMES,
+                    help=f"Frames processed per vectorized block. Default is {BATCH_BLOCK_FRAMES}.")
+parser.add_argument("--roi", type=parse_roi, action="append", default=[], metavar="NAME=X,Y,W,H",
+                    help="Region of interest to track (in sensor pixels), can be given more than once.")
+parser.add_argument("--alarm-high", type=float, default=None, help="Alarm when the maximum exceeds this (C).")
+parser.add_argument("--alarm-low", type=float, default=None, help="Alarm when the minimum falls below this (C).")
+parser.add_argument("--alarm-frames", type=int, default=BATCH_ALARM_FRAMES,
+                    help=f"Consecutive frames beyond a threshold that make an alarm. Default is {BATCH_ALARM_FRAMES}.")
+parser.add_argument("--force", action="store_true", help="Analyze sessions again even if results exist.")
+args = parser.parse_args()
+
+
+def find_recordings(inputs: list[str]) -> list[str]:
+    """
+    Expands directories into the recordings they contain.
+    """
+    paths = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for directory, _, files in os.walk(path):
+                paths += sorted(os.path.join(directory, name) for name in files
+                                if name.lower().endswith((RAW_RECORDING_EXTENSION, ARCHIVE_EXTENSION)))
+        else:
+            paths.append(path)
+    return paths
+
+
+def main():
+    os.makedirs(args.output, exist_ok=True)
+    parameters = {
+        "rois": args.roi,
+        "alarm_high": args.alarm_high,
+        "alarm_low": args.alarm_low,
+        "alarm_frames": args.alarm_frames}
+
+    # Sessions with results for these parameters are done already
+    recordings = find_recordings(args.inputs)
+    pending = []
+    for path in recordings:
+        output_path = get_output_path(path, args.output, parameters)
+        if args.force or not os.path.exists(output_path):
+            pending.append((path, output_path))
+    sessions = len(pending)
+    print(f'{sessions} sessions to analyze ({len(recordings) - sessions} already done), '
+          f'results in {args.output}')
+
+    start_time = time.perf_counter()
+    frames = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        futures = {executor.submit(analyze_session, path, output_path, block_frames=args.block_frames, **parameters):
+                   path for path, output_path in pending}
+        for done, future in enumerate(as_completed(futures), 1):
+            path = futures[future]
+            try:
+                summary = future.result()
+            except Exception as e:
+                failed += 1
+                print(f'[{done}/{sessions}] {path}: failed, {e}')
+                continue
+
+            frames += summary["frames"]
+            elapsed = time.perf_counter() - start_time
+            print(f'[{done}/{sessions}] {path}: {summary["frames"]} frames in {summary["seconds"]:.1f} s, '
+                  f'min {summary["minimum_temperature"]:.2f} C, max {summary["maximum_temperature"]:.2f} C, '
+                  f'{summary["alarms"]} alarms '
+                  f'({frames / elapsed:.0f} frames/s overall, ETA {elapsed / done * (sessions - done):.0f} s)')
+
+    print(f'Analyzed {sessions - failed} sessions ({frames} frames) in {time.perf_counter() - start_time:.1f} s'
+          + (f', {failed} failed' if failed else ''))
+    return 1 if failed else 0
+
+
+# Basic main call
+if __name__ == '__main__':
+    sys.exit(main())
@@ -3,6 +3,10 @@ import cv2
 
 from defaults.values import *
 from enums.ColormapEnum import Colormap
+from enums.AgcModeEnum import AgcMode
+from helpers.agcHelper import AutomaticGainControl
+from helpers.pipelineHelper import BUFFER_YUV
+from helpers.stagesHelper import *
 
 
 class GuiController:
@@ -14,7 +18,9 @@ class GuiController:
                  colormap: Colormap = COLORMAP,
                  contrast: float = CONTRAST,
                  blur_radius: int = BLUR_RADIUS,
-                 threshold: int = THRESHOLD):
+                 threshold: int = THRESHOLD,
+                 agc_mode: AgcMode = AGC_MODE,
+                 headless: bool = False):
         # Passed parameters
         self.window_title = window_title
         self.width = width
@@ -24,81 +30,139 @@ class GuiController:
         self.contrast = contrast
         self.blur_radius = blur_radius
         self.threshold = threshold
+        self.headless = headless
+        
+        # Automatic gain control, manual contrast applies while it is off
+        self.agc = AutomaticGainControl(mode=agc_mode)
         
         # Calculated properties
         self.scaled_width = int(self.width * self.scale)
         self.scaled_height = int(self.height * self.scale)
         
+        # Digital zoom viewport, kept in sensor coordinates so it is independent of scale and colormap
+        self.zoom: int = ZOOM
+        self.viewport_center_x: float = self.width / 2
+        self.viewport_center_y: float = self.height / 2
+        
         # States
         self.is_hud_visible: bool = HUD_VISIBLE
         self.is_fullscreen: bool = FULLSCREEN
         self.is_inverted: bool = False
+        self.is_recording: bool = False
         
         # Recording stats
         self.recording_start_time: float = RECORDING_START_TIME
         self.last_snapshot_time: str = LAST_SNAPSHOT_TIME
         self.recording_duration: str = RECORDING_DURATION
         
+        # Extra HUD lines (e.g. playback position), drawn below the standard ones
+        self.hud_extra_lines: list[str] = []
+        
         # Other
         self._font = FONT
         
-        # Initialize the GUI
-        cv2.namedWindow(self.window_title, cv2.WINDOW_GUI_NORMAL)
-        cv2.resizeWindow(self.window_title, self.scaled_width, self.scaled_height)
+        # Initialize the GUI (headless renders without ever opening a window, e.g. for soak testing)
+        if not self.headless:
+            cv2.namedWindow(self.window_title, cv2.WINDOW_GUI_NORMAL)
+            cv2.resizeWindow(self.window_title, self.scaled_width, self.scaled_height)
+
+    def close(self):
+        """
+        Destroys the GUI window.
+        """
+        if not self.headless:
+            cv2.destroyWindow(self.window_title)
         
     def update_recording_stats(self):
         """
         Updates the recording stats.
         """
-        self.recording_duration = (time.time() - self.recording_start_time)
+        self.recording_duration = (time.monotonic() - self.recording_start_time)
         self.recording_duration = time.strftime("%H:%M:%S", time.gmtime(self.recording_duration))
-        
-    def draw_gui(self, imdata, temp, average_temp, max_temp, min_temp, is_recording, mrow, mcol, lrow, lcol):
+
+    def get_render_state(self) -> tuple:
         """
-        Draws the GUI elements on the thermal image.
+        Returns everything besides the frame data that affects the rendered image, for caching renders.
         """
-        # Apply affects
-        img = self.apply_effects(imdata=imdata)
-        
-        # Apply inversion
-        if self.is_inverted:
-            img = cv2.bitwise_not(img)
+        return (self.scale, self.colormap, self.contrast, self.agc.mode, self.blur_radius, self.threshold,
+                self.is_hud_visible, self.is_inverted, self.last_snapshot_time, self.recording_duration,
+                tuple(self.hud_extra_lines), self.get_viewport())
 
-        # Apply colormap
-        img = self.apply_colormap(img)
+    def get_viewport(self) -> tuple[int, int, int, int]:
+        """
+        Returns the visible region of the sensor as (x, y, width, height) in sensor pixels.
+        """
+        width = max(round(self.width / self.zoom), 1)
+        height = max(round(self.height / self.zoom), 1)
+        x = min(max(round(self.viewport_center_x - width / 2), 0), self.width - width)
+        y = min(max(round(self.viewport_center_y - height / 2), 0), self.height - height)
+        return x, y, width, height
 
-        # Draw crosshairs
-        img = self.draw_crosshairs(img)
-        
-        # Draw temp
-        img = self.draw_temp(img, temp)
+    def set_zoom(self, zoom: int):
+        """
+        Zooms in or out around the center of the viewport.
+        """
+        self.zoom = min(max(zoom, ZOOM_MIN), ZOOM_MAX)
+        self.pan(0, 0)
 
-        # Draw HUD
-        if self.is_hud_visible:
-            img = self.draw_hud(img, average_temp, is_recording)
-        
-        # Display floating max temp
-        if max_temp > average_temp + self.threshold:
-            img = self.draw_max_temp(img, mrow, mcol, max_temp)
+    def pan(self, dx: float, dy: float):
+        """
+        Moves the viewport by the given fractions of its size, keeping it within the sensor.
+        """
+        _, _, width, height = self.get_viewport()
+        self.viewport_center_x = min(max(self.viewport_center_x + dx * width, width / 2), self.width - width / 2)
+        self.viewport_center_y = min(max(self.viewport_center_y + dy * height, height / 2), self.height - height / 2)
 
-        # Display floating min temp
-        if min_temp < average_temp - self.threshold:
-            img = self.draw_min_temp(img, lrow, lcol, min_temp)
-            
-        # Update recording stats
-        if is_recording:
-            self.update_recording_stats()
+    def reset_viewport(self):
+        """
+        Zooms all the way out.
+        """
+        self.zoom = ZOOM_MIN
+        self.viewport_center_x = self.width / 2
+        self.viewport_center_y = self.height / 2
 
-        return img
+    def crop(self, data):
+        """
+        Returns the part of sensor resolution data (thermal plane or image) inside the viewport, as a view.
+        """
+        if self.zoom == 1:
+            return data
+        x, y, width, height = self.get_viewport()
+        return data[y:y + height, x:x + width]
+
+    def is_in_viewport(self, x: int, y: int) -> bool:
+        """
+        Whether the sensor pixel is visible.
+        """
+        viewport_x, viewport_y, width, height = self.get_viewport()
+        return viewport_x <= x < viewport_x + width and viewport_y <= y < viewport_y + height
 
+    def sensor_to_view(self, x: int, y: int) -> tuple[int, int]:
+        """
+        Maps a sensor pixel to the center of its (magnified) area on the displayed image.
+        """
+        viewport_x, viewport_y, width, height = self.get_viewport()
+        return (int((x - viewport_x + 0.5) * self.scaled_width / width),
+                int((y - viewport_y + 0.5) * self.scaled_height / height))
+
+    @staticmethod
+    def thermal_to_image(thdata):
+        """
+        Builds a displayable 8-bit BGR image from a raw thermal plane, for sources without the camera's image data.
+        """
+        img = cv2.normalize(thdata, None, 0, 255, cv2.NORM_MINMAX, cv2.CV_8U)
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
+        
     def draw_temp(self, img, temp):
         """
         Draws the temperature onto the image.
         """
+        # The sensor center, wherever the viewport puts it
+        x, y = self.sensor_to_view(self.width // 2, self.height // 2)
         cv2.putText(
             img,
             str(temp)+' C',
-            (int(self.scaled_width / 2) + 10, int(self.scaled_height / 2) - 10),
+            (x + 10, y - 10),
             self._font,
             0.45,
             (0, 0, 0),
@@ -107,7 +171,7 @@ class GuiController:
         cv2.putText(
             img,
             str(temp)+' C',
-            (int(self.scaled_width / 2) + 10, int(self.scaled_height / 2) - 10),
+            (x + 10, y - 10),
             self._font,
             0.45,
             (0, 255, 255),
@@ -120,29 +184,31 @@ class GuiController:
         """
         Draws crosshairs on the image.
         """
+        # The sensor center, wherever the viewport puts it
+        x, y = self.sensor_to_view(self.width // 2, self.height // 2)
         cv2.line(
             img,
-            (int(self.scaled_width / 2), int(self.scaled_height / 2) + 20),
-            (int(self.scaled_width / 2), int(self.scaled_height / 2) - 20),
+            (x, y + 20),
+            (x, y - 20),
             (255, 255, 255),
             2)  # vline
         cv2.line(
             img,
-            (int(self.scaled_width / 2) + 20, int(self.scaled_height / 2)),
-            (int(self.scaled_width / 2) - 20, int(self.scaled_height / 2)),
+            (x + 20, y),
+            (x - 20, y),
             (255, 255, 255),
             2)  # hline
 
         cv2.line(
             img,
-            (int(self.scaled_width / 2), int(self.scaled_height / 2) + 20),
-            (int(self.scaled_width / 2), int(self.scaled_height / 2) - 20),
+            (x, y + 20),
+            (x, y - 20),
             (0, 0, 0),
             1)  # vline
         cv2.line(
             img,
-            (int(self.scaled_width / 2) + 20, int(self.scaled_height / 2)),
-            (int(self.scaled_width / 2) - 20, int(self.scaled_height / 2)),
+            (x + 20, y),
+            (x - 20, y),
             (0, 0, 0),
             1)  # hline
         
@@ -156,7 +222,7 @@ class GuiController:
         cv2.rectangle(
             img, 
             (0, 0),
-            (160, 134),
+            (160, 134 + 14 * len(self.hud_extra_lines)),
             (0, 0, 0),
             -1)
         
@@ -203,7 +269,7 @@ class GuiController:
 
         cv2.putText(
             img,
-            'Scaling: '+str(self.scale)+' ',
+            'Scaling: '+str(self.scale)+(' Zoom: '+str(self.zoom)+'x' if self.zoom > 1 else '')+' ',
             (10, 70),
             self._font,
             0.4,
@@ -213,7 +279,7 @@ class GuiController:
 
         cv2.putText(
             img,
-            'Contrast: '+str(self.contrast)+' ',
+            'Contrast: '+(('AGC ' + self.agc.mode.name) if self.agc.is_enabled else str(self.contrast))+' ',
             (10, 84),
             self._font,
             0.4,
@@ -261,6 +327,17 @@ class GuiController:
             (0, 255, 255),
             1,
             cv2.LINE_AA)
+
+        for i, line in enumerate(self.hud_extra_lines):
+            cv2.putText(
+                img,
+                line,
+                (10, 140 + 14 * i),
+                self._font,
+                0.4,
+                (0, 255, 255),
+                1,
+                cv2.LINE_AA)
             
         return img
     
@@ -268,16 +345,18 @@ class GuiController:
         """
         Draws the maximum temperature point on the image.
         """
+        x, y = self.sensor_to_view(row, col)
+
         # Draw max temp circle(s)
         cv2.circle(
             img,
-            (row*self.scale, col*self.scale),
+            (x, y),
             5,
             (0, 0, 0),
             2)
         cv2.circle(
             img,
-            (row*self.scale, col*self.scale),
+            (x, y),
             5,
             (0, 0, 255),
             -1)
@@ -286,7 +365,7 @@ class GuiController:
         cv2.putText(
             img=img,
             text=str(max_temp) + ' C',
-            org=((row*self.scale)+10, (col*self.scale)+5),
+            org=(x + 10, y + 5),
             fontFace=self._font, 
             fontScale=0.45,
             color=(0, 0, 0), 
@@ -296,7 +375,7 @@ class GuiController:
         cv2.putText(
             img=img,
             text=str(max_temp) + ' C',
-            org=((row*self.scale)+10, (col*self.scale)+5),
+            org=(x + 10, y + 5),
             fontFace=self._font,
             fontScale=0.45,
             color=(0, 255, 255),
@@ -309,16 +388,18 @@ class GuiController:
         """
         Draws the minimum temperature point on the image.
         """
+        x, y = self.sensor_to_view(row, col)
+
         # Draw min temp circle
-        cv2.circle(img, (row*self.scale, col*self.scale), 5, (0, 0, 0), 2)
-        cv2.circle(img, (row*self.scale, col*self.scale), 5, (255, 0, 0), -1)
+        cv2.circle(img, (x, y), 5, (0, 0, 0), 2)
+        cv2.circle(img, (x, y), 5, (255, 0, 0), -1)
         
         # Draw min temp label(s)
         cv2.putText(
             img,
             str(min_temp) + ' C',
-            ((row*self.scale)+10,
-             (col*self.scale)+5),
+            (x + 10,
+             y + 5),
             self._font,
             0.45,
             (0, 0, 0),
@@ -327,8 +408,8 @@ class GuiController:
         cv2.putText(
             img,
             str(min_temp) + ' C',
-            ((row*self.scale)+10,
-             (col*self.scale)+5),
+            (x + 10,
+             y + 5),
             self._font,
             0.45,
             (0, 255, 255),
@@ -337,49 +418,73 @@ class GuiController:
 
         return img
     
-    def apply_colormap(self, img):
+    def apply_colormap(self, img, dst=None):
         """
         Applies the selected colormap to the image data.
         """
         match Colormap(self.colormap):
             case Colormap.JET:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_JET)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_JET, dst)
             case Colormap.HOT:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_HOT)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_HOT, dst)
             case Colormap.MAGMA:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_MAGMA)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_MAGMA, dst)
             case Colormap.INFERNO:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_INFERNO)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_INFERNO, dst)
             case Colormap.PLASMA:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_PLASMA)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_PLASMA, dst)
             case Colormap.BONE:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_BONE)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_BONE, dst)
             case Colormap.SPRING:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_SPRING)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_SPRING, dst)
             case Colormap.AUTUMN:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_AUTUMN)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_AUTUMN, dst)
             case Colormap.VIRIDIS:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_VIRIDIS)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_VIRIDIS, dst)
             case Colormap.PARULA:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_PARULA)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_PARULA, dst)
             case Colormap.INV_RAINBOW:
-                img = cv2.applyColorMap(img, cv2.COLORMAP_RAINBOW)
-                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+                img = cv2.applyColorMap(img, cv2.COLORMAP_RAINBOW, dst)
+                img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB, img)
 
         return img
 
-    def apply_effects(self, imdata):
+    def apply_contrast(self, imdata, dst=None):
         """
-        Applies effects (contrast, blur, upscaling, interpolation, etc.) to the image data.
+        Applies the manual contrast to the image data.
         """
-        # Contrast
-        img = cv2.convertScaleAbs(imdata, alpha=self.contrast)
-        
-        # Bicubic interpolate, upscale and blur
-        img = cv2.resize(img, (self.scaled_width, self.scaled_height), interpolation=cv2.INTER_CUBIC)  # Scale up!
-        
-        # Blur
-        if self.blur_radius > 0:
-            img = cv2.blur(img, (self.blur_radius, self.blur_radius))
+        return cv2.convertScaleAbs(imdata, dst, alpha=self.contrast)
 
-        return img
+    def apply_scaling(self, img, dst=None):
+        """
+        Bicubic interpolates and upscales the image.
+        """
+        return cv2.resize(img, (self.scaled_width, self.scaled_height), dst, interpolation=cv2.INTER_CUBIC)
+
+    def apply_blur(self, img, dst=None):
+        """
+        Blurs the image.
+        """
+        return cv2.blur(img, (self.blur_radius, self.blur_radius), dst)
+
+    def get_render_stages(self, image_source: str = BUFFER_YUV) -> list:
+        """
+        Returns the render stages in order: viewport crop, effects, invert, colormap, crosshairs, temp, HUD,
+        max/min labels.
+        The image comes from the camera's own image data (BUFFER_YUV) or the thermal data (BUFFER_RAW).
+        """
+        return [
+            CameraImageStage(self) if image_source == BUFFER_YUV else ThermalImageStage(self),
+            ViewportStage(self),
+            RawViewportStage(self),
+            ContrastStage(self),
+            AgcStage(self),
+            ScaleStage(self),
+            BlurStage(self),
+            InvertStage(self),
+            ColormapStage(self),
+            CrosshairsStage(self),
+            CenterTemperatureLabelStage(self),
+            HudStage(self),
+            MaximumLabelStage(self),
+            MinimumLabelStage(self)]
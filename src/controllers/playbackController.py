@@ -0,0 +1,219 @@
+import os
+import time
+import cv2
+
+from defaults.values import *
+from defaults.keybinds import *
+
+from controllers.thermalcameracontroller import ThermalCameraController
+from helpers.archiveHelper import open_recording
+from helpers.cacheHelper import LruCache, PrefetchingFrameCache
+from helpers.pipelineHelper import BUFFER_RAW
+
+
+class PlaybackController(ThermalCameraController):
+    # Recordings only hold the thermal data, so the image is built from it
+    _image_source: str = BUFFER_RAW
+
+    def __init__(self,
+                 recording_path: str,
+                 media_output_path: str = MEDIA_OUTPUT_PATH,
+                 frame_cache_size: int = PLAYBACK_FRAME_CACHE_SIZE,
+                 render_cache_size: int = PLAYBACK_RENDER_CACHE_SIZE,
+                 prefetch_count: int = PLAYBACK_PREFETCH_COUNT):
+        # Recording init
+        self._recording = open_recording(recording_path)
+        self._frame_count: int = len(self._recording)
+        if not self._frame_count:
+            self._recording.close()
+            raise ValueError(f"{recording_path} does not contain any frames")
+
+        super().__init__(
+            width=self._recording.width,
+            height=self._recording.height,
+            fps=self._recording.fps,
+            device_name=os.path.splitext(os.path.basename(recording_path))[0],
+            media_output_path=media_output_path)
+
+        # Playback state
+        self._position: int = 0
+        self._direction: int = 1
+        self._speed: float = PLAYBACK_DEFAULT_SPEED
+        self._is_playing: bool = True
+
+        # The position is derived from the time since this anchor, so slow renders skip frames instead of drifting
+        self._anchor_time: float = time.monotonic()
+        self._anchor_position: int = 0
+
+        # Last value written to the scrub bar, to tell our own updates apart from the user dragging it
+        self._trackbar_position: int = 0
+
+        # Caches: decoded thermal planes (read ahead in the playback direction) and rendered images
+        self._frames = PrefetchingFrameCache(
+            self._recording.read_frame,
+            self._frame_count,
+            frame_cache_size,
+            prefetch_count)
+        self._renders = LruCache(render_cache_size)
+
+    @staticmethod
+    def print_bindings():
+        """
+        Print key bindings for the program, including the playback controls.
+        """
+        ThermalCameraController.print_bindings()
+
+        keybinds = \
+            f'Playback Key Bindings:\n' \
+            f'{KEY_PLAY_PAUSE!r} : Play/Pause\n' \
+            f'{KEY_STEP_BACKWARD} {KEY_STEP_FORWARD}: Step one frame backward/forward\n' \
+            f'{KEY_DECREASE_SPEED} {KEY_INCREASE_SPEED}: Decrease/Increase playback speed\n' \
+            f'{KEY_REVERSE} : Reverse playback direction\n' \
+            f'Drag the {PLAYBACK_TRACKBAR_NAME} bar to scrub through the recording\n'
+
+        print(keybinds)
+
+    def _seek(self, position: int):
+        """
+        Moves playback to the given frame and restarts the playback clock from there.
+        """
+        self._position = min(max(position, 0), self._frame_count - 1)
+        self._anchor_time = time.monotonic()
+        self._anchor_position = self._position
+
+    def _on_trackbar(self, position: int):
+        """
+        Scrub bar callback.
+        """
+        if position != self._trackbar_position:
+            self._trackbar_position = position
+            self._seek(position)
+
+    def _advance(self) -> int:
+        """
+        Updates the playback position from the playback clock.
+        Returns the delay in ms until the next frame is due.
+        """
+        if not self._is_playing:
+            return PLAYBACK_PAUSED_KEY_DELAY
+
+        frame_rate = self._fps * self._speed
+        frames_elapsed = int((time.monotonic() - self._anchor_time) * frame_rate)
+        position = self._anchor_position + self._direction * frames_elapsed
+
+        # Stop at either end of the recording
+        if not 0 <= position < self._frame_count:
+            self._seek(position)
+            self._is_playing = False
+            return PLAYBACK_PAUSED_KEY_DELAY
+
+        self._position = position
+        next_frame_time = self._anchor_time + (frames_elapsed + 1) / frame_rate
+        return max(1, int((next_frame_time - time.monotonic()) * 1000))
+
+    def _check_for_playback_key_press(self, key_press: int):
+        """
+        Checks and acts on playback key presses.
+        """
+        if key_press == ord(KEY_PLAY_PAUSE):  # Play/pause
+            self._is_playing = not self._is_playing
+            # Playing from the end of the recording starts over
+            if self._is_playing and self._position == (self._frame_count - 1 if self._direction > 0 else 0):
+                self._position = 0 if self._direction > 0 else self._frame_count - 1
+            self._seek(self._position)
+
+        if key_press == ord(KEY_STEP_FORWARD):  # Step forward
+            self._is_playing = False
+            self._seek(self._position + 1)
+        if key_press == ord(KEY_STEP_BACKWARD):  # Step backward
+            self._is_playing = False
+            self._seek(self._position - 1)
+
+        if key_press == ord(KEY_INCREASE_SPEED):  # Faster
+            speed_index = PLAYBACK_SPEEDS.index(self._speed)
+            self._speed = PLAYBACK_SPEEDS[min(speed_index + 1, len(PLAYBACK_SPEEDS) - 1)]
+            self._seek(self._position)
+        if key_press == ord(KEY_DECREASE_SPEED):  # Slower
+            speed_index = PLAYBACK_SPEEDS.index(self._speed)
+            self._speed = PLAYBACK_SPEEDS[max(speed_index - 1, 0)]
+            self._seek(self._position)
+
+        if key_press == ord(KEY_REVERSE):  # Reverse direction
+            self._direction = -self._direction
+            self._seek(self._position)
+
+    def _playback_status(self) -> str:
+        """
+        Returns the playback status line shown on the HUD.
+        """
+        state = ('>' if self._direction > 0 else '<') if self._is_playing else '||'
+        return f'{state} {self._position + 1}/{self._frame_count} {self._speed:g}x'
+
+    def _render_frame(self, index: int):
+        """
+        Renders the frame at the index, reusing a cached render if nothing that affects it has changed.
+        """
+        if self._is_recording:
+            self._gui_controller.update_recording_stats()
+        key = (index, self._is_recording, self._gui_controller.get_render_state())
+        heatmap = self._renders.get(key)
+        if heatmap is None:
+            # Temperatures are recomputed from the raw data, exactly as they are live
+            self._update_pipelines()
+            self._update_dirty_regions(is_full=True)
+            self._update_statistics(self._frames.get(index))
+            # The pipeline draws into reused buffers, so the cache keeps its own copy
+            heatmap = self._render().copy()
+            self._renders.put(key, heatmap)
+        return heatmap
+
+    def run(self):
+        """
+        Runs the playback loop for the program.
+        """
+        cv2.createTrackbar(
+            PLAYBACK_TRACKBAR_NAME,
+            self._gui_controller.window_title,
+            0,
+            self._frame_count - 1,
+            self._on_trackbar)
+
+        try:
+            self._seek(0)
+            recorded_position = -1
+            while True:
+                delay = self._advance()
+
+                # Read ahead in the direction of playback while this frame is on screen
+                self._frames.prefetch(self._position, self._direction)
+
+                # Draw GUI elements
+                self._gui_controller.hud_extra_lines = [self._playback_status()]
+                heatmap = self._render_frame(self._position)
+
+                # Check for recording (each frame once, even when paused or slowed down)
+                if self._is_recording and recorded_position != self._position:
+                    recorded_position = self._position
+                    self._video_out.write(heatmap)
+                    self._raw_out.write(self._frames.get(self._position))
+
+                # Display image and follow the position on the scrub bar
+                self._show(heatmap)
+                if self._trackbar_position != self._position:
+                    self._trackbar_position = self._position
+                    cv2.setTrackbarPos(PLAYBACK_TRACKBAR_NAME, self._gui_controller.window_title, self._position)
+
+                # Check for quit and other inputs
+                key_press = cv2.waitKey(delay)
+                if key_press == ord(KEY_QUIT):
+                    return
+
+                self._check_for_playback_key_press(key_press=key_press)
+                self._check_for_key_press(key_press=key_press, img=heatmap)
+        finally:
+            # Check for recording and close out
+            self._stop_recording()
+            self._is_recording = not RECORDING
+            self._gui_controller.close()
+            self._frames.close()
+            self._recording.close()
@@ -0,0 +1,83 @@
+import os
+
+from defaults.values import *
+from defaults.keybinds import *
+
+from controllers.thermalcameracontroller import ThermalCameraController
+from helpers.soakHelper import SoakMonitor
+from helpers.syntheticCaptureHelper import SyntheticCapture
+
+
+class SoakController(ThermalCameraController):
+    def __init__(self,
+                 monitor: SoakMonitor,
+                 duration: float = SOAK_DURATION,
+                 max_frames: int = None,
+                 media_output_path: str = MEDIA_OUTPUT_PATH,
+                 record_interval: int = SOAK_RECORD_INTERVAL,
+                 snapshot_interval: int = SOAK_SNAPSHOT_INTERVAL,
+                 settings_interval: int = SOAK_SETTINGS_INTERVAL,
+                 keep_media: bool = False):
+        """
+        Drives the regular capture loop headless from a synthetic source at maximum speed, pressing keys on a
+        schedule so recording, snapshots and settings changes are exercised as well.
+        Recordings and snapshots are deleted as soon as they are finished unless keep_media is set, the test is
+        about opening and releasing the writers, and the data would otherwise fill the disk within hours.
+        """
+        super().__init__(device_name="SOAK", media_output_path=media_output_path, headless=True)
+
+        self._monitor = monitor
+        self._duration = duration
+        self._max_frames = max_frames
+        self._record_interval = record_interval
+        self._snapshot_interval = snapshot_interval
+        self._settings_interval = settings_interval
+        self._keep_media = keep_media
+        self._frame_index: int = 0
+
+        # Settings keys pressed in turn, each cycle ends up back at the starting state
+        self._settings_keys = [KEY_CYCLE_THROUGH_COLORMAPS, KEY_INVERT, KEY_TOGGLE_HUD, KEY_INCREASE_BLUR,
+                               KEY_INVERT, KEY_TOGGLE_HUD, KEY_DECREASE_BLUR]
+
+    def _open_capture(self):
+        return SyntheticCapture(
+            width=self._width,
+            height=self._height,
+            duration=self._duration,
+            max_frames=self._max_frames)
+
+    def _stop_recording(self):
+        """
+        Releases the recording like a normal stop, then deletes its files.
+        """
+        is_recording = self._video_out is not None or self._raw_out is not None
+        super()._stop_recording()
+        if is_recording and not self._keep_media:
+            for path in self._recording_paths:
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _snapshot(self, img):
+        """
+        Takes a snapshot like a normal key press, then deletes it.
+        """
+        snapshot_time = super()._snapshot(img)
+        if not self._keep_media and os.path.exists(self._snapshot_path):
+            os.remove(self._snapshot_path)
+        return snapshot_time
+
+    def _poll_key(self) -> int:
+        """
+        Accounts the frame with the monitor and returns the scheduled key press for it, if any.
+        """
+        self._monitor.on_frame()
+        self._frame_index += 1
+
+        if self._record_interval and self._frame_index % self._record_interval == 0:
+            return ord(KEY_STOP if self._is_recording else KEY_RECORD)
+        if self._snapshot_interval and self._frame_index % self._snapshot_interval == 0:
+            return ord(KEY_SNAPSHOT)
+        if self._settings_interval and self._frame_index % self._settings_interval == 0:
+            settings_index = self._frame_index // self._settings_interval % len(self._settings_keys)
+            return ord(self._settings_keys[settings_index])
+        return -1
@@ -7,17 +7,31 @@ from defaults.values import *
 from defaults.keybinds import *
 
 from enums.ColormapEnum import Colormap
+from enums.AgcModeEnum import AgcMode
 from controllers.guiController import GuiController
+from helpers.rawRecordingHelper import RawRecordingWriter
+from helpers.changeDetectionHelper import ChangeDetector
+from helpers.metricsHelper import FrameMetrics, MetricsServer, write_metrics_file
+from helpers.pipelineHelper import *
+from helpers.stagesHelper import StatisticsStage
+from helpers.statisticsHelper import calculate_block_statistics, normalize_temperature as normalize_raw_temperature
 
 
 class ThermalCameraController:
+    # Buffer the render pipeline builds the image from
+    _image_source: str = BUFFER_YUV
+
     def __init__(self,
                  device_index: int = VIDEO_DEVICE_INDEX,
                  width: int = SENSOR_WIDTH,
                  height: int = SENSOR_HEIGHT,
                  fps: int = DEVICE_FPS,
                  device_name: str = DEVICE_NAME,
-                 media_output_path: str = MEDIA_OUTPUT_PATH):
+                 media_output_path: str = MEDIA_OUTPUT_PATH,
+                 change_detection: bool = CHANGE_DETECTION,
+                 headless: bool = False,
+                 metrics_file: str = None,
+                 metrics_port: int = None):
         # Parameters init
         self._device_index: int = device_index
         self._device_name: str = device_name
@@ -36,6 +50,20 @@ class ThermalCameraController:
         self._lcol: int = 0
         self._lrow: int = 0
 
+        # Change detection init, unchanged frames reuse the previous statistics and render
+        self._change_detector = ChangeDetector(width=self._width, height=self._height) if change_detection else None
+        self._heatmap = None
+        self._heatmap_state = None
+        self._reused_render_count: int = 0
+
+        # Metrics init: capture timing, drops, latency and stage timings, optionally exported to a file/endpoint
+        self._metrics = FrameMetrics(fps=self._fps)
+        self._metrics_file: str = metrics_file
+        self._metrics_port: int = metrics_port
+        self._metrics_server = None
+        self._next_metrics_export: float = 0.0
+        self._next_metrics_hud_update: float = 0.0
+
         # Media/recording init
         self._is_recording = not RECORDING
         self._media_output_path: str = media_output_path
@@ -46,11 +74,31 @@ class ThermalCameraController:
         # GUI Init
         self._gui_controller = GuiController(
             width=self._width,
-            height=self._height)
+            height=self._height,
+            headless=headless)
+
+        # Pipelines init: both are (re)built whenever the GUI state changes, see _update_pipelines()
+        self._buffers: dict = {}
+        self._statistics_pipeline = Pipeline(
+            "statistics",
+            [StatisticsStage(self)],
+            outputs=(),
+            sources=(BUFFER_RAW, BUFFER_DIRTY),
+            metrics=self._metrics)
+        self._render_pipeline = Pipeline(
+            "render",
+            self._gui_controller.get_render_stages(self._image_source),
+            outputs=(BUFFER_IMAGE,),
+            sources=(BUFFER_RAW, BUFFER_DIRTY, self._image_source) + STATISTICS_BUFFERS,
+            metrics=self._metrics)
+        self._pipeline_state = None
 
         # OpenCV init
         self._cap = None
         self._video_out = None
+        self._raw_out = None
+        self._recording_paths: list[str] = []
+        self._snapshot_path: str = None
 
     @staticmethod
     def print_bindings():
@@ -64,7 +112,11 @@ class ThermalCameraController:
             f': Floating High and Low Temp Label Threshold\n' \
             f'{KEY_INCREASE_SCALE} {KEY_DECREASE_SCALE}: Change Interpolated scale Note: ' \
             f'This will not change the window size on the Pi\n' \
-            f'{KEY_INCREASE_CONTRAST} {KEY_DECREASE_CONTRAST}: Contrast\n' \
+            f'{KEY_INCREASE_CONTRAST} {KEY_DECREASE_CONTRAST}: Contrast (manual, turns off AGC)\n' \
+            f'{KEY_CYCLE_AGC} : Cycle through automatic gain control (AGC) modes\n' \
+            f'{KEY_ZOOM_IN} {KEY_ZOOM_OUT}: Zoom in/out\n' \
+            f'{KEY_PAN_UP} {KEY_PAN_DOWN} {KEY_PAN_LEFT} {KEY_PAN_RIGHT}: Pan up/down/left/right while zoomed\n' \
+            f'{KEY_RESET_VIEWPORT} : Reset zoom and pan\n' \
             f'{KEY_FULLSCREEN} {KEY_WINDOWED}: Fullscreen Windowed ' \
             f'(note going back to windowed does not seem to work on the Pi!)\n' \
             f'{KEY_RECORD} {KEY_STOP}: Record and Stop\n' \
@@ -127,6 +179,22 @@ class ThermalCameraController:
                 cv2.resizeWindow(self._gui_controller.window_title, self._gui_controller.scaled_width,
                                  self._gui_controller.scaled_height)
 
+        # ZOOM/PAN CONTROLS (the viewport is kept in sensor coordinates, so scale changes do not affect it)
+        if key_press == ord(KEY_ZOOM_IN):  # Zoom in
+            self._gui_controller.set_zoom(self._gui_controller.zoom + ZOOM_INCREMENT)
+        if key_press == ord(KEY_ZOOM_OUT):  # Zoom out
+            self._gui_controller.set_zoom(self._gui_controller.zoom - ZOOM_INCREMENT)
+        if key_press == ord(KEY_PAN_UP):  # Pan up
+            self._gui_controller.pan(0, -PAN_STEP)
+        if key_press == ord(KEY_PAN_DOWN):  # Pan down
+            self._gui_controller.pan(0, PAN_STEP)
+        if key_press == ord(KEY_PAN_LEFT):  # Pan left
+            self._gui_controller.pan(-PAN_STEP, 0)
+        if key_press == ord(KEY_PAN_RIGHT):  # Pan right
+            self._gui_controller.pan(PAN_STEP, 0)
+        if key_press == ord(KEY_RESET_VIEWPORT):  # Reset zoom and pan
+            self._gui_controller.reset_viewport()
+
         # FULLSCREEN CONTROLS
         if key_press == ord(KEY_FULLSCREEN):  # Enable fullscreen
             self._gui_controller.is_fullscreen = FULLSCREEN
@@ -139,17 +207,23 @@ class ThermalCameraController:
             cv2.resizeWindow(self._gui_controller.window_title, self._gui_controller.scaled_width,
                              self._gui_controller.scaled_height)
 
-        # CONTRAST CONTROLS
+        # CONTRAST CONTROLS (manual contrast overrides automatic gain control)
         if key_press == ord(KEY_INCREASE_CONTRAST):  # Increase contrast
+            self._gui_controller.agc.mode = AgcMode.OFF
             self._gui_controller.contrast += CONTRAST_INCREMENT
             self._gui_controller.contrast = round(self._gui_controller.contrast, 1)  # fix round error
             if self._gui_controller.contrast >= CONTRAST_MAX:
                 self._gui_controller.contrast = CONTRAST_MAX
         if key_press == ord(KEY_DECREASE_CONTRAST):  # Decrease contrast
+            self._gui_controller.agc.mode = AgcMode.OFF
             self._gui_controller.contrast -= CONTRAST_INCREMENT
             self._gui_controller.contrast = round(self._gui_controller.contrast, 1)  # fix round error
             if self._gui_controller.contrast <= CONTRAST_MIN:
                 self._gui_controller.contrast = CONTRAST_MIN
+        if key_press == ord(KEY_CYCLE_AGC):  # Cycle through automatic gain control modes
+            agc_mode = (self._gui_controller.agc.mode.value + 1) % len(AgcMode)
+            self._gui_controller.agc.mode = AgcMode(agc_mode)
+            self._gui_controller.agc.reset()
 
         # HUD CONTROLS
         if key_press == ord(KEY_TOGGLE_HUD):  # Toggle HUD
@@ -169,29 +243,49 @@ class ThermalCameraController:
 
         # RECORDING/MEDIA CONTROLS
         if key_press == ord(KEY_RECORD) and not self._is_recording:  # Start recording
-            self._video_out = self._record()
+            self._video_out, self._raw_out = self._record()
             self._is_recording = RECORDING
-            self._gui_controller.recording_start_time = time.time()
+            self._gui_controller.recording_start_time = time.monotonic()
 
         if key_press == ord(KEY_STOP):  # Stop recording
             self._is_recording = not RECORDING
             self._gui_controller.recording_duration = RECORDING_DURATION
+            self._stop_recording()
 
         if key_press == ord(KEY_SNAPSHOT):  # Take a snapshot
             self._gui_controller.last_snapshot_time = self._snapshot(img)
 
     def _record(self):
         """
-        STart recording video to file.
+        STart recording video to file, alongside the raw thermal data so temperatures can be recovered later.
         """
         current_time_str = time.strftime("%Y%m%d--%H%M%S")
+        self._recording_paths = [
+            f"{self._media_output_path}/{current_time_str}-output.avi",
+            f"{self._media_output_path}/{current_time_str}-output{RAW_RECORDING_EXTENSION}"]
         # do NOT use mp4 here, it is flakey!
         self._video_out = cv2.VideoWriter(
-            f"{self._media_output_path}/{current_time_str}-output.avi",
+            self._recording_paths[0],
             cv2.VideoWriter_fourcc(*'XVID'),
             self._fps,
             (self._gui_controller.scaled_width, self._gui_controller.scaled_height))
-        return self._video_out
+        self._raw_out = RawRecordingWriter(
+            self._recording_paths[1],
+            self._width,
+            self._height,
+            self._fps)
+        return self._video_out, self._raw_out
+
+    def _stop_recording(self):
+        """
+        Releases the video and raw recording files, if any are open.
+        """
+        if self._video_out is not None:
+            self._video_out.release()
+            self._video_out = None
+        if self._raw_out is not None:
+            self._raw_out.close()
+            self._raw_out = None
 
     def _snapshot(self, img):
         """
@@ -200,7 +294,8 @@ class ThermalCameraController:
         # I would put colons in here, but it Win throws a fit if you try and open them!
         current_time_str = time.strftime("%Y%m%d-%H%M%S")
         self._gui_controller.last_snapshot_time = time.strftime("%H:%M:%S")
-        cv2.imwrite(f"{self._media_output_path}/{self._device_name}-{current_time_str}.png", img)
+        self._snapshot_path = f"{self._media_output_path}/{self._device_name}-{current_time_str}.png"
+        cv2.imwrite(self._snapshot_path, img)
         return self._gui_controller.last_snapshot_time
 
     @staticmethod
@@ -209,7 +304,7 @@ class ThermalCameraController:
         Normalizes/converts the raw temperature data using the formula found by LeoDJ.
         Link: https://www.eevblog.com/forum/thermal-imaging/infiray-and-their-p2-pro-discussion/200/
         """
-        return (raw_temp / d) - c
+        return normalize_raw_temperature(raw_temp, d, c)
 
     def calculate_temperature(self, thdata):
         """
@@ -224,43 +319,163 @@ class ThermalCameraController:
         """
         return thdata[self._height // 2][self._width // 2]
 
+    # The single frame statistics below are kept for callers of the old API, stacks of frames should go through
+    # calculate_block_statistics() directly.
+
     def calculate_average_temperature(self, thdata):
         """
         Calculates the average temperature of the frame.
         """
-        return round(self.normalize_temperature(thdata.mean()), TEMPERATURE_SIG_DIGITS)
+        return calculate_block_statistics(thdata).average_temperature[0]
 
     def calculate_minimum_temperature(self, thdata):
         """
         Calculates the minimum temperature of the frame.
         """
-        self._lcol, self._lrow = np.unravel_index(np.argmin(thdata), thdata.shape)
-        return round(self.normalize_temperature(thdata[self._lcol][self._lrow]), TEMPERATURE_SIG_DIGITS)
+        statistics = calculate_block_statistics(thdata)
+        self._lcol, self._lrow = int(statistics.minimum_y[0]), int(statistics.minimum_x[0])
+        return statistics.minimum_temperature[0]
 
     def calculate_maximum_temperature(self, thdata):
         """
         Calculates the maximum temperature of the frame.
         """
-        # Find the max temperature in the frame
-        self._mcol, self._mrow = np.unravel_index(np.argmax(thdata), thdata.shape)
-        return round(self.normalize_temperature(thdata[self._mcol][self._mrow]), TEMPERATURE_SIG_DIGITS)
+        statistics = calculate_block_statistics(thdata)
+        self._mcol, self._mrow = int(statistics.maximum_y[0]), int(statistics.maximum_x[0])
+        return statistics.maximum_temperature[0]
 
-    def run(self):
+    def print_change_detection_stats(self):
         """
-        Runs the main runtime loop for the program.
+        Print how many frames skipped processing because they were unchanged.
         """
-        # Initialize video
-        self._cap = cv2.VideoCapture(self._device_index)
+        if self._change_detector is not None:
+            print(f'{self._change_detector}, {self._reused_render_count} renders reused')
+
+    def _update_pipelines(self) -> bool:
+        """
+        Rebuilds the pipelines if the GUI state changed since the last build, so only the stages the current
+        settings need are run. The statistics pipeline only calculates what the render pipeline consumes.
+        Returns True if the statistics pipeline now calculates something it did not before.
+        """
+        state = self._gui_controller.get_render_state()
+        if state == self._pipeline_state:
+            return False
+        self._pipeline_state = state
+
+        self._render_pipeline.build()
+        outputs = tuple(buffer for buffer in STATISTICS_BUFFERS if buffer in self._render_pipeline.required_sources)
+        is_extended = not set(outputs).issubset(self._statistics_pipeline.outputs)
+        self._statistics_pipeline.outputs = outputs
+        self._statistics_pipeline.build()
+        return is_extended
+
+    def _update_dirty_regions(self, is_full: bool = False):
+        """
+        Publishes the sensor regions that changed since the last processed frame (BUFFER_DIRTY), so stages can
+        update incrementally. The whole frame counts as dirty without change detection, or if is_full (e.g. the GUI
+        state changed). Skipped while no built pipeline consumes them.
+        """
+        if BUFFER_DIRTY not in self._render_pipeline.required_sources | self._statistics_pipeline.required_sources:
+            return
+        if is_full or self._change_detector is None:
+            self._buffers[BUFFER_DIRTY] = [(0, 0, self._width, self._height)]
+        else:
+            self._buffers[BUFFER_DIRTY] = self._change_detector.get_dirty_regions()
+
+    def _update_statistics(self, thm_pic):
+        """
+        Recalculates the temperature statistics of a thermal plane.
+        """
+        self._buffers[BUFFER_RAW] = thm_pic
+        self._statistics_pipeline.run(self._buffers)
+
+    def _render(self):
+        """
+        Draws the current frame's buffers along with the current statistics and GUI elements.
+        The image is drawn into buffers owned by the stages, so it is only valid until the next render.
+        """
+        self._gui_controller.is_recording = self._is_recording
+        return self._render_pipeline.run(self._buffers)[BUFFER_IMAGE]
+
+    def _open_capture(self):
+        """
+        Opens the video source the frames are read from.
+        """
+        cap = cv2.VideoCapture(self._device_index)
 
         """
         disable automatic YUY2 -> RGB conversion in OpenCV
         """
-        self._cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        cap.set(cv2.CAP_PROP_CONVERT_RGB, 0)
+        return cap
+
+    def _poll_key(self) -> int:
+        """
+        Returns the key pressed since the last frame, or -1.
+        """
+        if self._gui_controller.headless:
+            return -1
+        return cv2.waitKey(1)
 
-        # Start main runtime loop
+    def _show(self, heatmap):
+        """
+        Displays the rendered image.
+        """
+        if not self._gui_controller.headless:
+            cv2.imshow(self._gui_controller.window_title, heatmap)
+
+    def _update_metrics_outputs(self):
+        """
+        Refreshes the HUD metrics and writes the metrics file when they are due.
+        """
+        now = time.perf_counter()
+        if METRICS_HUD and now >= self._next_metrics_hud_update:
+            self._gui_controller.hud_extra_lines = self._metrics.get_hud_lines()
+            self._next_metrics_hud_update = now + METRICS_HUD_INTERVAL
+        if self._metrics_file and now >= self._next_metrics_export:
+            write_metrics_file(self._metrics_file, self._metrics.to_prometheus())
+            self._next_metrics_export = now + METRICS_EXPORT_INTERVAL
+
+    def _close(self):
+        """
+        Releases the capture, any open recordings and the window.
+        """
+        if self._metrics_server is not None:
+            self._metrics_server.close()
+            self._metrics_server = None
+        if self._metrics_file:
+            write_metrics_file(self._metrics_file, self._metrics.to_prometheus())
+        self._stop_recording()
+        self._is_recording = not RECORDING
+        if self._cap is not None:
+            self._cap.release()
+            self._cap = None
+        self._gui_controller.close()
+        self.print_change_detection_stats()
+
+    def run(self):
+        """
+        Runs the main runtime loop for the program.
+        """
+        # Initialize video
+        self._cap = self._open_capture()
+        try:
+            if self._metrics_port:
+                self._metrics_server = MetricsServer(self._metrics, self._metrics_port)
+            self._run_loop()
+        finally:
+            self._close()
+
+    def _run_loop(self):
+        """
+        Processes frames until the capture closes or the user quits.
+        """
         while self._cap.isOpened():
             ret, frame = self._cap.read()
             if ret:
+                # Stamp the frame as soon as it leaves the capture
+                self._metrics.on_capture()
+
                 # Split frame into two parts: image data and thermal data
                 # We use frame[0] since on Windows this is returned as a 2D array with size [1][<number of pixels>]
                 # Other OS are untested
@@ -274,51 +489,58 @@ class ThermalCameraController:
                     exit(1)
                 else:
                     yuv_pic = image_array.reshape((self._height, self._width, 2))
-                # Next convert to RGB
-                rgb_pic = cv2.cvtColor(yuv_pic, cv2.COLOR_YUV2RGB_YUY2)
                 # Assemble the thermal data
                 thm_pic = np.frombuffer(thdata, dtype=np.uint16).reshape((self._height, self._width))
+                self._metrics.end_stage("decode")
+
+                self._buffers[BUFFER_YUV] = yuv_pic
+                self._buffers[BUFFER_RAW] = thm_pic
+
+                # Skip the processing chain if the frame is effectively identical to the last processed one
+                is_changed = self._change_detector is None or self._change_detector.update(thm_pic)
+                if not is_changed:
+                    self._metrics.unchanged_frames += 1
+                self._metrics.end_stage("change_detection")
+
+                # Refresh the HUD metrics and export them, timed apart from the frame processing
+                self._update_metrics_outputs()
+                self._metrics.end_stage("metrics")
 
                 # Now parse the data from the bottom frame and convert to temp!
-                # Grab data from the center pixel...
-                self._raw_temp = self.calculate_raw_temperature(thm_pic)
-                self._temp = self.calculate_temperature(thm_pic)
-
-                # Calculate minimum temperature
-                self._min_temp = self.calculate_minimum_temperature(thm_pic)
-
-                # Calculate maximum temperature
-                self._max_temp = self.calculate_maximum_temperature(thm_pic)
-
-                # Find the average temperature in the frame
-                self._avg_temp = self.calculate_average_temperature(thm_pic)
-
-                # Draw GUI elements
-                heatmap = self._gui_controller.draw_gui(
-                    imdata=rgb_pic,
-                    temp=self._temp,
-                    max_temp=self._max_temp,
-                    min_temp=self._min_temp,
-                    average_temp=self._avg_temp,
-                    is_recording=self._is_recording,
-                    mcol=self._mcol,
-                    mrow=self._mrow,
-                    lcol=self._lcol,
-                    lrow=self._lrow)
+                # A GUI change can make the render need statistics that were not calculated so far
+                if self._is_recording:
+                    self._gui_controller.update_recording_stats()
+                is_extended = self._update_pipelines()
+                heatmap_state = (self._is_recording, self._gui_controller.get_render_state())
+                self._update_dirty_regions(is_full=heatmap_state != self._heatmap_state)
+                if is_extended or is_changed:
+                    self._update_statistics(thm_pic)
+                self._metrics.end_stage("statistics")
+
+                # Draw GUI elements, unless neither the frame nor the GUI state changed
+                if is_changed or heatmap_state != self._heatmap_state:
+                    self._heatmap = self._render()
+                    self._heatmap_state = heatmap_state
+                else:
+                    self._reused_render_count += 1
+                heatmap = self._heatmap
+                self._metrics.end_stage("render")
 
                 # Check for recording
                 if self._is_recording:
                     self._video_out.write(heatmap)
+                    self._raw_out.write(thm_pic)
+                    self._metrics.end_stage("recording")
+
+                # Display image, the window only repaints once waitKey pumps its events
+                self._show(heatmap)
+                key_press = self._poll_key()
+                self._metrics.end_stage("display")
+                self._metrics.on_displayed()
 
                 # Check for quit and other inputs
-                key_press = cv2.waitKey(1)
                 if key_press == ord(KEY_QUIT):
-                    # Check for recording and close out
-                    if self._is_recording:
-                        self._video_out.release()
                     return
 
                 self._check_for_key_press(key_press=key_press, img=heatmap)
-
-                # Display image
-                cv2.imshow(self._gui_controller.window_title, heatmap)
+                self._metrics.end_stage("input")
@@ -0,0 +1,5 @@
+# ARCHIVE CONSTANTS
+ARCHIVE_EXTENSION: str = ".tca"
+ARCHIVE_KEYFRAME_INTERVAL: int = 25
+ARCHIVE_COMPRESSOR: str = "zlib"
+ARCHIVE_COMPRESSION_LEVEL: int = 6
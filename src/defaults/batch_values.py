@@ -0,0 +1,6 @@
+# BATCH ANALYTICS CONSTANTS
+BATCH_OUTPUT_PATH: str = "./batch"
+BATCH_EXTENSION: str = ".npz"
+BATCH_FORMAT_VERSION: int = 1  # Part of every output's hash, bump when the analysis changes
+BATCH_BLOCK_FRAMES: int = 256  # Frames processed per vectorized block (256 frames are 24 MiB of raw data)
+BATCH_ALARM_FRAMES: int = 3  # Consecutive frames beyond an alarm threshold before it counts as an alarm
@@ -13,3 +13,9 @@ SCALE: int = 3
 SCALE_MAX: int = 5
 SCALE_MIN: int = 1
 SCALE_INCREMENT: int = 1
+# Zoom (digital, crops the sensor data to the viewport before scaling)
+ZOOM: int = 1
+ZOOM_MAX: int = 8
+ZOOM_MIN: int = 1
+ZOOM_INCREMENT: int = 1
+PAN_STEP: float = 0.25  # Fraction of the viewport moved per pan key press
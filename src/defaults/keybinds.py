@@ -6,6 +6,14 @@ KEY_INCREASE_SCALE = 'd'
 KEY_DECREASE_SCALE = 'c'
 KEY_INCREASE_CONTRAST = 'f'
 KEY_DECREASE_CONTRAST = 'v'
+KEY_CYCLE_AGC = 'g'
+KEY_ZOOM_IN = '='
+KEY_ZOOM_OUT = '-'
+KEY_PAN_UP = '8'
+KEY_PAN_DOWN = '2'
+KEY_PAN_LEFT = '4'
+KEY_PAN_RIGHT = '6'
+KEY_RESET_VIEWPORT = '5'
 KEY_FULLSCREEN = 'e'
 KEY_WINDOWED = 'w'
 KEY_RECORD = 'r'
@@ -14,4 +22,12 @@ KEY_SNAPSHOT = 'p'
 KEY_CYCLE_THROUGH_COLORMAPS = 'm'
 KEY_INVERT = 'i'
 KEY_TOGGLE_HUD = 'h'
-KEY_QUIT = 'q'
\ No newline at end of file
+KEY_QUIT = 'q'
+
+# PLAYBACK
+KEY_PLAY_PAUSE = ' '
+KEY_STEP_FORWARD = '.'
+KEY_STEP_BACKWARD = ','
+KEY_INCREASE_SPEED = ']'
+KEY_DECREASE_SPEED = '['
+KEY_REVERSE = 'b'
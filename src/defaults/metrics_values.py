@@ -0,0 +1,11 @@
+# METRICS CONSTANTS
+# Upper bounds (seconds) of the fixed histogram buckets, an overflow bucket catches everything above
+METRICS_HISTOGRAM_BOUNDS: tuple = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.04, 0.06, 0.08, 0.12, 0.16, 0.25, 0.5, 1.0)
+METRICS_DROP_TOLERANCE: float = 1.5  # Inter-frame gaps longer than this many frame intervals count as drops
+METRICS_FPS_SMOOTHING: float = 0.05  # Weight of the newest interval in the displayed FPS
+METRICS_HUD: bool = True
+METRICS_HUD_INTERVAL: float = 1.0  # Seconds between HUD metrics updates (each one forces a re-render)
+METRICS_EXPORT_INTERVAL: float = 5.0  # Seconds between metrics file writes
+METRICS_FILE_NAME: str = "metrics.prom"
+METRICS_HOST: str = "127.0.0.1"
+METRICS_PREFIX: str = "thermal_camera"
@@ -0,0 +1,8 @@
+# PLAYBACK CONSTANTS
+PLAYBACK_FRAME_CACHE_SIZE: int = 512  # Decoded thermal planes (~100 KB each)
+PLAYBACK_RENDER_CACHE_SIZE: int = 48  # Rendered images (up to ~3.7 MB each at max scale)
+PLAYBACK_PREFETCH_COUNT: int = 64
+PLAYBACK_SPEEDS: tuple = (0.125, 0.25, 0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+PLAYBACK_DEFAULT_SPEED: float = 1.0
+PLAYBACK_PAUSED_KEY_DELAY: int = 30  # ms to wait for input while paused, keeps the scrub bar responsive
+PLAYBACK_TRACKBAR_NAME: str = "Frame"
@@ -1,4 +1,5 @@
 from enums.ColormapEnum import Colormap
+from enums.AgcModeEnum import AgcMode
 
 # IMAGE PROCESSING CONSTANTS
 COLORMAP: Colormap = Colormap.NONE
@@ -16,4 +17,19 @@ BLUR_RADIUS_INCREMENT: int = 1
 THRESHOLD: int = 2
 THRESHOLD_MAX: int = 3
 THRESHOLD_MIN: int = 0
-THRESHOLD_INCREMENT: int = 1
\ No newline at end of file
+THRESHOLD_INCREMENT: int = 1
+# Change detection
+CHANGE_DETECTION: bool = True
+CHANGE_BLOCK_SIZE: int = 16  # Sensor pixels per block side
+CHANGE_SUBSAMPLE: int = 2  # Compare every Nth pixel in each direction
+CHANGE_THRESHOLD: int = 8  # Raw units (1/64 C) a block must change by to count as dirty
+# Automatic gain control
+AGC_MODE: AgcMode = AgcMode.OFF
+AGC_LOW_PERCENTILE: float = 0.5  # Share (%) of the coldest pixels clipped to black
+AGC_HIGH_PERCENTILE: float = 99.5  # Share (%) of pixels below the span top, the hottest rest is clipped to white
+AGC_MIN_SPAN: int = 128  # Raw units (1/64 C), keeps flat scenes from being stretched into noise
+AGC_PLATEAU: float = 3.0  # Max gain of PLATEAU over LINEAR (also limited to span / AGC_MIN_SPAN)
+AGC_SMOOTHING: float = 0.15  # Weight of the newest frame in the span and mapping, lower is steadier
+AGC_BIN_SHIFT: int = 2  # Raw values are binned in groups of 2^N for the histogram
+# Statistics
+STATISTICS_CHUNK_FRAMES: int = 64  # Frames reduced at once by the block statistics, bounds temporary memory
@@ -3,3 +3,4 @@ from os import getcwd
 # DEFAULT RECORDING CONSTANTS
 MEDIA_OUTPUT_PATH: str = f"{getcwd()}/output"
 RECORDING: bool = True
+RAW_RECORDING_EXTENSION: str = ".tcr"
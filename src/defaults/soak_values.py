@@ -0,0 +1,28 @@
+# SOAK TEST CONSTANTS
+SOAK_DURATION: float = 4 * 60 * 60  # seconds
+SOAK_SAMPLE_INTERVAL: float = 10.0  # seconds
+SOAK_CI_DURATION: float = 60.0  # seconds
+SOAK_CI_SAMPLE_INTERVAL: float = 1.0  # seconds
+SOAK_WARMUP_FRACTION: float = 0.2  # Share of the run ignored for trends, while caches and pools fill up
+SOAK_TOP_ALLOCATORS: int = 10
+SOAK_REPEAT_EVERY: int = 10  # Every Nth synthetic frame repeats the previous one
+SOAK_RECORD_INTERVAL: int = 250  # Frames between toggling recording on/off
+SOAK_SNAPSHOT_INTERVAL: int = 5000  # Frames between snapshots
+SOAK_SETTINGS_INTERVAL: int = 100  # Frames between cycling colormap/invert/HUD settings
+# Sampled metrics, with the growth (per hour, after warmup) above which a trend is flagged, as long as the
+# absolute growth over the run also exceeds the minimum (keeps short runs from flagging noise)
+SOAK_METRICS: tuple = ("rss_bytes", "traced_bytes", "allocated_blocks", "open_handles", "gc_objects")
+SOAK_GROWTH_LIMITS: dict = {
+    "rss_bytes": 16 * 1024 * 1024,
+    "traced_bytes": 4 * 1024 * 1024,
+    "allocated_blocks": 20000,
+    "open_handles": 1,
+    "gc_objects": 10000,
+}
+SOAK_GROWTH_MINIMUMS: dict = {
+    "rss_bytes": 4 * 1024 * 1024,
+    "traced_bytes": 1024 * 1024,
+    "allocated_blocks": 5000,
+    "open_handles": 2,
+    "gc_objects": 2000,
+}
@@ -2,6 +2,11 @@ from defaults.gui_values import *
 from defaults.thermal_values import *
 from defaults.recording_values import *
 from defaults.processing_values import *
+from defaults.archive_values import *
+from defaults.playback_values import *
+from defaults.soak_values import *
+from defaults.metrics_values import *
+from defaults.batch_values import *
 
 # MAIN CONSTANTS
 VIDEO_DEVICE_INDEX: int = 0
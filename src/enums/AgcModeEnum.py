@@ -0,0 +1,7 @@
+from enum import Enum
+
+
+class AgcMode(Enum):
+    OFF = 0
+    LINEAR = 1
+    PLATEAU = 2
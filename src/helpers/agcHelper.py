@@ -0,0 +1,119 @@
+import cv2
+import numpy as np
+
+from defaults.values import *
+from enums.AgcModeEnum import AgcMode
+
+
+class AutomaticGainControl:
+    def __init__(self,
+                 mode: AgcMode = AGC_MODE,
+                 low_percentile: float = AGC_LOW_PERCENTILE,
+                 high_percentile: float = AGC_HIGH_PERCENTILE,
+                 min_span: int = AGC_MIN_SPAN,
+                 plateau: float = AGC_PLATEAU,
+                 smoothing: float = AGC_SMOOTHING,
+                 bin_shift: int = AGC_BIN_SHIFT):
+        """
+        Maps raw uint16 thermal planes to 8-bit display images based on their histogram.
+        The display span is clipped at percentiles of the histogram and then either mapped linearly (LINEAR) or
+        plateau equalized (PLATEAU). Span and mapping are smoothed over time so the image does not pump.
+        """
+        self.mode = mode
+        self.low_percentile = low_percentile
+        self.high_percentile = high_percentile
+        self.min_span = min_span
+        self.plateau = plateau
+        self.smoothing = smoothing
+        self.bin_shift = bin_shift
+
+        # Smoothed state, None until the first frame
+        self.low: float = None
+        self.high: float = None
+        self._lut = None
+
+    @property
+    def is_enabled(self) -> bool:
+        return self.mode != AgcMode.OFF
+
+    def reset(self):
+        """
+        Drops the smoothed state, so the next frame is mapped from scratch.
+        """
+        self.low = None
+        self.high = None
+        self._lut = None
+
+    def _smooth(self, previous, current):
+        if previous is None:
+            return current
+        return previous + self.smoothing * (current - previous)
+
+    def update_span(self, thdata):
+        """
+        Updates the smoothed display span from the percentiles of the frame's histogram.
+        """
+        binned = thdata >> self.bin_shift
+        offset = int(binned.min())
+        histogram = np.bincount((binned - offset).ravel())
+
+        # Percentiles from the cumulative histogram, no sorting needed
+        cumulative = np.cumsum(histogram)
+        low_bin = np.searchsorted(cumulative, cumulative[-1] * self.low_percentile / 100)
+        high_bin = np.searchsorted(cumulative, cumulative[-1] * self.high_percentile / 100)
+        low = float((low_bin + offset) << self.bin_shift)
+        high = float((high_bin + offset + 1) << self.bin_shift)
+
+        # Widen narrow spans around their center
+        if high - low < self.min_span:
+            center = (high + low) / 2
+            low, high = center - self.min_span / 2, center + self.min_span / 2
+
+        self.low = self._smooth(self.low, low)
+        self.high = self._smooth(self.high, high)
+
+    @staticmethod
+    def _find_clip_limit(histogram, gain: float) -> float:
+        """
+        Returns the level count to clip the histogram at, such that no level exceeds gain times the uniform share
+        once the clipped excess is spread evenly over all levels.
+        That is the limit c at which the levels below it are short of c by (gain - 1) * total in sum.
+        """
+        levels = np.sort(histogram)
+        below = np.cumsum(levels)
+        shortfall = np.arange(1, len(levels) + 1) * levels - below
+        k = int(np.searchsorted(shortfall, (gain - 1) * below[-1]))
+        if k == 0:
+            return float(levels[0])
+        if k == len(levels):
+            return float(levels[-1])
+        return float(((gain - 1) * below[-1] + below[k - 1]) / k)
+
+    def apply(self, thdata):
+        """
+        Updates the AGC with the frame and returns it as an 8-bit BGR image.
+        """
+        self.update_span(thdata)
+
+        # Linear mapping of the span to 0-255, saturating outside of it
+        alpha = 255 / (self.high - self.low)
+        img = cv2.addWeighted(thdata, alpha, thdata, 0, -self.low * alpha, dtype=cv2.CV_8U)
+
+        if self.mode == AgcMode.PLATEAU:
+            # Equalize the histogram of the span: the 256 levels of the linear image are the raw values in
+            # [low, high], binned. Capping each level at the plateau keeps large uniform areas from hogging the
+            # output range. Capping it at the gain that would stretch min_span raw units over the whole output as
+            # well, and spreading the clipped excess evenly, keeps flat scenes looking as they do under LINEAR
+            # instead of stretching their noise.
+            histogram = np.bincount(img.ravel(), minlength=256).astype(np.float32)
+            total = histogram.sum()
+            gain = max(min(self.plateau, (self.high - self.low) / self.min_span), 1.0)
+            np.minimum(histogram, self._find_clip_limit(histogram, gain), out=histogram)
+            histogram += (total - histogram.sum()) / 256
+            cumulative = np.cumsum(histogram)
+            lut = (cumulative - cumulative[0]) * (255 / max(cumulative[-1] - cumulative[0], 1))
+
+            self._lut = self._smooth(self._lut, lut)
+            img = cv2.LUT(img, (self._lut + 0.5).astype(np.uint8))
+
+        return cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)
@@ -0,0 +1,326 @@
+import bz2
+import lzma
+import struct
+import time
+import zlib
+import numpy as np
+
+from defaults.values import *
+from helpers.rawRecordingHelper import RawRecordingReader, RawRecordingWriter, RAW_DTYPE
+
+# Archive format (.tca)
+#     header   magic, version, width, height, fps, keyframe interval, compressor id, compression level
+#     frames   one compressed payload per frame, back-to-back
+#     index    (offset, length) of every frame payload
+#     footer   index offset, frame count, index magic
+#
+# Keyframes (every `keyframe_interval` frames) are delta coded against their left neighbour, all other frames
+# against the previous frame. Deltas are zigzag encoded so small negative steps stay small, then the low and
+# high byte planes are split apart before compression, which groups the mostly-zero high bytes together.
+# Seeking to any frame decodes at most one GOP (the keyframe plus the frames leading up to the target).
+ARCHIVE_MAGIC: bytes = b"TCAR"
+ARCHIVE_INDEX_MAGIC: bytes = b"TCIX"
+ARCHIVE_VERSION: int = 1
+ARCHIVE_HEADER = struct.Struct("<4sHHHHHBB2x")
+ARCHIVE_FOOTER = struct.Struct("<QI4s")
+ARCHIVE_INDEX_DTYPE = np.dtype([("offset", "<u8"), ("length", "<u4")])
+
+COMPRESSORS: dict = {
+    "zlib": (0, lambda data, level: zlib.compress(data, level), zlib.decompress),
+    "bz2": (1, lambda data, level: bz2.compress(data, level), bz2.decompress),
+    "lzma": (2, lambda data, level: lzma.compress(data, preset=level), lzma.decompress),
+}
+COMPRESSOR_NAMES: dict = {compressor_id: name for name, (compressor_id, _, _) in COMPRESSORS.items()}
+COMPRESSION_LEVELS: dict = {"zlib": range(0, 10), "bz2": range(1, 10), "lzma": range(0, 10)}
+
+
+def _zigzag_encode(delta):
+    """
+    Maps wrapped int16 deltas to uint16 so that small magnitudes of either sign become small values.
+    """
+    delta = delta.view(np.int16)
+    return ((delta << 1) ^ (delta >> 15)).view(np.uint16)
+
+
+def _zigzag_decode(encoded):
+    """
+    Inverse of _zigzag_encode, returns the wrapped delta as uint16.
+    """
+    return (encoded >> 1) ^ (-(encoded & 1).view(np.int16)).view(np.uint16)
+
+
+def _shuffle(plane) -> bytes:
+    """
+    Splits a uint16 plane into its low and high byte planes.
+    """
+    return np.ascontiguousarray(plane, dtype=RAW_DTYPE).view(np.uint8).reshape(-1, 2).T.tobytes()
+
+
+def _unshuffle(data: bytes, height: int, width: int):
+    """
+    Inverse of _shuffle.
+    """
+    planes = np.frombuffer(data, dtype=np.uint8).reshape(2, -1)
+    return np.ascontiguousarray(planes.T).view(RAW_DTYPE).reshape(height, width)
+
+
+class ArchiveWriter:
+    def __init__(self,
+                 path: str,
+                 width: int = SENSOR_WIDTH,
+                 height: int = SENSOR_HEIGHT,
+                 fps: int = DEVICE_FPS,
+                 keyframe_interval: int = ARCHIVE_KEYFRAME_INTERVAL,
+                 compressor: str = ARCHIVE_COMPRESSOR,
+                 level: int = ARCHIVE_COMPRESSION_LEVEL):
+        if compressor not in COMPRESSORS:
+            raise ValueError(f"Unknown compressor '{compressor}', expected one of {', '.join(COMPRESSORS)}")
+        if keyframe_interval < 1:
+            raise ValueError("The keyframe interval must be at least 1")
+        levels = COMPRESSION_LEVELS[compressor]
+        if level not in levels:
+            raise ValueError(f"Invalid {compressor} compression level {level}, "
+                             f"expected {levels.start}-{levels.stop - 1}")
+
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.keyframe_interval = keyframe_interval
+        self.compressor = compressor
+        self.level = level
+        self.frame_count: int = 0
+        self.compressed_bytes: int = 0
+
+        self._compressor_id, self._compress, _ = COMPRESSORS[compressor]
+        self._previous = None
+        self._index: list[tuple[int, int]] = []
+
+        self._file = open(self.path, "wb")
+        self._file.write(ARCHIVE_HEADER.pack(
+            ARCHIVE_MAGIC, ARCHIVE_VERSION, self.width, self.height, self.fps, self.keyframe_interval,
+            self._compressor_id, self.level))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, thdata):
+        """
+        Encodes and appends a single thermal plane to the archive.
+        """
+        if thdata.shape != (self.height, self.width):
+            raise ValueError(f"Expected a {self.height}x{self.width} thermal plane, got {thdata.shape}")
+        frame = np.ascontiguousarray(thdata, dtype=np.uint16)
+
+        if self.frame_count % self.keyframe_interval == 0:
+            delta = np.diff(frame, axis=1, prepend=np.uint16(0))
+        else:
+            delta = frame - self._previous
+        payload = self._compress(_shuffle(_zigzag_encode(delta)), self.level)
+
+        self._index.append((self._file.tell(), len(payload)))
+        self._file.write(payload)
+        self._previous = frame
+        self.frame_count += 1
+        self.compressed_bytes += len(payload)
+
+    def close(self):
+        """
+        Writes the frame index and footer, then closes the archive.
+        """
+        if self._file.closed:
+            return
+        index_offset = self._file.tell()
+        self._file.write(np.array(self._index, dtype=ARCHIVE_INDEX_DTYPE).tobytes())
+        self._file.write(ARCHIVE_FOOTER.pack(index_offset, self.frame_count, ARCHIVE_INDEX_MAGIC))
+        self._file.close()
+
+
+class ArchiveReader:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(self.path, "rb")
+
+        header = self._file.read(ARCHIVE_HEADER.size)
+        if len(header) != ARCHIVE_HEADER.size:
+            self._file.close()
+            raise ValueError(f"{self.path} is too short to be a thermal archive")
+        (magic, version, self.width, self.height, self.fps, self.keyframe_interval,
+         compressor_id, self.level) = ARCHIVE_HEADER.unpack(header)
+        if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION or compressor_id not in COMPRESSOR_NAMES:
+            self._file.close()
+            raise ValueError(f"{self.path} is not a thermal archive")
+        self.compressor: str = COMPRESSOR_NAMES[compressor_id]
+        self._decompress = COMPRESSORS[self.compressor][2]
+
+        # The frame index lives at the end of the file, located through the footer
+        self._file.seek(-ARCHIVE_FOOTER.size, 2)
+        index_offset, self.frame_count, index_magic = ARCHIVE_FOOTER.unpack(self._file.read(ARCHIVE_FOOTER.size))
+        if index_magic != ARCHIVE_INDEX_MAGIC:
+            self._file.close()
+            raise ValueError(f"{self.path} is missing its frame index (was the archive closed properly?)")
+        self._file.seek(index_offset)
+        self.index = np.frombuffer(
+            self._file.read(self.frame_count * ARCHIVE_INDEX_DTYPE.itemsize), dtype=ARCHIVE_INDEX_DTYPE)
+
+        # Frames decoded so far in the current GOP, so reads within it (in either direction) decode at most once
+        self._gop_start: int = -1
+        self._gop_frames: list = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.frame_count
+
+    @property
+    def compressed_bytes(self) -> int:
+        return int(self.index["length"].sum())
+
+    def keyframe_for(self, index: int) -> int:
+        """
+        Returns the index of the keyframe that starts the GOP containing the given frame.
+        """
+        return index - index % self.keyframe_interval
+
+    def _decode_delta(self, index: int):
+        offset, length = self.index[index]
+        self._file.seek(int(offset))
+        data = self._decompress(self._file.read(int(length)))
+        return _zigzag_decode(_unshuffle(data, self.height, self.width))
+
+    def read_frame(self, index: int):
+        """
+        Returns the thermal plane at the given frame index, decoding from the nearest keyframe if needed.
+        """
+        if not 0 <= index < self.frame_count:
+            raise IndexError(f"Frame {index} is out of range for {self.frame_count} frames")
+
+        keyframe = self.keyframe_for(index)
+        if keyframe != self._gop_start:
+            self._gop_start = keyframe
+            self._gop_frames = [np.cumsum(self._decode_delta(keyframe), axis=1, dtype=np.uint16)]
+
+        while len(self._gop_frames) <= index - keyframe:
+            self._gop_frames.append(self._gop_frames[-1] + self._decode_delta(keyframe + len(self._gop_frames)))
+
+        return self._gop_frames[index - keyframe].copy()
+
+    def iter_frames(self, start: int = 0):
+        """
+        Yields the thermal planes in order, starting at the given frame index.
+        """
+        for index in range(start, self.frame_count):
+            yield self.read_frame(index)
+
+    def close(self):
+        """
+        Closes the archive file.
+        """
+        self._file.close()
+
+
+def open_recording(path: str):
+    """
+    Opens either a raw recording or an archive based on its file extension.
+    """
+    if path.lower().endswith(ARCHIVE_EXTENSION):
+        return ArchiveReader(path)
+    return RawRecordingReader(path)
+
+
+class TranscodeStats:
+    def __init__(self, frames: int, raw_bytes: int, compressed_bytes: int,
+                 encode_seconds: float = 0.0, decode_seconds: float = 0.0):
+        self.frames = frames
+        self.raw_bytes = raw_bytes
+        self.compressed_bytes = compressed_bytes
+        self.encode_seconds = encode_seconds
+        self.decode_seconds = decode_seconds
+
+    @property
+    def ratio(self) -> float:
+        return self.raw_bytes / self.compressed_bytes if self.compressed_bytes else 0.0
+
+    @staticmethod
+    def _throughput(nbytes: int, seconds: float) -> float:
+        return nbytes / (1024 * 1024) / seconds if seconds > 0 else 0.0
+
+    @property
+    def encode_mb_per_second(self) -> float:
+        return self._throughput(self.raw_bytes, self.encode_seconds)
+
+    @property
+    def decode_mb_per_second(self) -> float:
+        return self._throughput(self.raw_bytes, self.decode_seconds)
+
+    def __str__(self):
+        lines = [
+            f'Frames: {self.frames}',
+            f'Raw size: {self.raw_bytes / (1024 * 1024):.2f} MB',
+            f'Compressed size: {self.compressed_bytes / (1024 * 1024):.2f} MB',
+            f'Compression ratio: {self.ratio:.2f}:1']
+        if self.encode_seconds:
+            lines.append(f'Encode: {self.encode_mb_per_second:.1f} MB/s '
+                         f'({self.frames / self.encode_seconds:.0f} frames/s)')
+        if self.decode_seconds:
+            lines.append(f'Decode: {self.decode_mb_per_second:.1f} MB/s '
+                         f'({self.frames / self.decode_seconds:.0f} frames/s)')
+        return '\n'.join(lines)
+
+
+def transcode_to_archive(source_path: str,
+                         archive_path: str,
+                         keyframe_interval: int = ARCHIVE_KEYFRAME_INTERVAL,
+                         compressor: str = ARCHIVE_COMPRESSOR,
+                         level: int = ARCHIVE_COMPRESSION_LEVEL,
+                         verify: bool = False) -> TranscodeStats:
+    """
+    Streams a raw recording into a compressed archive. With verify, the archive is decoded again and compared
+    against the source, which also measures the decode throughput.
+    """
+    encode_seconds = 0.0
+    with RawRecordingReader(source_path) as source, \
+            ArchiveWriter(archive_path, source.width, source.height, source.fps,
+                          keyframe_interval, compressor, level) as archive:
+        for frame in source.iter_frames():
+            start = time.perf_counter()
+            archive.write(frame)
+            encode_seconds += time.perf_counter() - start
+        stats = TranscodeStats(archive.frame_count, archive.frame_count * source.frame_size,
+                               archive.compressed_bytes, encode_seconds)
+
+    if verify:
+        decode_seconds = 0.0
+        with RawRecordingReader(source_path) as source, ArchiveReader(archive_path) as archive:
+            for index, expected in enumerate(source.iter_frames()):
+                start = time.perf_counter()
+                frame = archive.read_frame(index)
+                decode_seconds += time.perf_counter() - start
+                if not np.array_equal(frame, expected):
+                    raise ValueError(f"Archive verification failed at frame {index}")
+        stats.decode_seconds = decode_seconds
+
+    return stats
+
+
+def transcode_to_raw(archive_path: str, raw_path: str) -> TranscodeStats:
+    """
+    Streams a compressed archive back into the uncompressed capture format.
+    """
+    decode_seconds = 0.0
+    with ArchiveReader(archive_path) as archive, \
+            RawRecordingWriter(raw_path, archive.width, archive.height, archive.fps) as raw:
+        for index in range(archive.frame_count):
+            start = time.perf_counter()
+            frame = archive.read_frame(index)
+            decode_seconds += time.perf_counter() - start
+            raw.write(frame)
+        return TranscodeStats(archive.frame_count, archive.frame_count * archive.width * archive.height *
+                              RAW_DTYPE.itemsize, archive.compressed_bytes, decode_seconds=decode_seconds)
@@ -0,0 +1,146 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+from defaults.values import *
+from helpers.archiveHelper import open_recording
+from helpers.statisticsHelper import calculate_block_statistics
+
+
+def parse_roi(text: str) -> tuple:
+    """
+    Parses a region of interest given as "name=x,y,width,height" (in sensor pixels).
+    """
+    name, separator, box = text.partition("=")
+    values = [int(value) for value in box.split(",")] if separator else []
+    if not name or len(values) != 4 or values[2] <= 0 or values[3] <= 0:
+        raise ValueError(f"Expected a region of interest as name=x,y,width,height, got {text!r}")
+    return (name, *values)
+
+
+def get_output_path(source_path: str, output_path: str, parameters: dict) -> str:
+    """
+    Returns where the analysis of a session goes. The name is a hash of the source file (name, size and modification
+    time) and the analysis parameters, so unchanged sessions are recognised as done and new thresholds never
+    overwrite results computed with others.
+    """
+    stat = os.stat(source_path)
+    key = json.dumps([BATCH_FORMAT_VERSION, os.path.abspath(source_path), stat.st_size, stat.st_mtime_ns, parameters],
+                     sort_keys=True)
+    digest = hashlib.sha1(key.encode()).hexdigest()[:12]
+    name = os.path.splitext(os.path.basename(source_path))[0]
+    return os.path.join(output_path, f"{name}-{digest}{BATCH_EXTENSION}")
+
+
+def iter_blocks(recording, block_frames: int = BATCH_BLOCK_FRAMES):
+    """
+    Yields (first frame index, block) for consecutive blocks of up to block_frames frames.
+    Raw recordings are sliced straight out of their memory map, archives are decoded into the block.
+    """
+    frames = getattr(recording, "frames", None)
+    for start in range(0, recording.frame_count, block_frames):
+        stop = min(start + block_frames, recording.frame_count)
+        if frames is not None:
+            yield start, frames[start:stop]
+        else:
+            yield start, np.stack([recording.read_frame(index) for index in range(start, stop)])
+
+
+def block_statistics(block, rois: tuple = ()) -> dict:
+    """
+    Calculates the per-frame statistics columns of an (N, height, width) block, including the regions of interest.
+    """
+    columns = {name: values.astype(np.float32) if values.dtype == np.float64 else values
+               for name, values in calculate_block_statistics(block).as_columns().items()}
+
+    for name, x, y, roi_width, roi_height in rois:
+        roi = calculate_block_statistics(block[:, y:y + roi_height, x:x + roi_width])
+        columns[f"roi_{name}_maximum"] = roi.maximum_temperature.astype(np.float32)
+        columns[f"roi_{name}_minimum"] = roi.minimum_temperature.astype(np.float32)
+        columns[f"roi_{name}_average"] = roi.average_temperature.astype(np.float32)
+
+    return columns
+
+
+def find_alarm_events(active, min_frames: int = BATCH_ALARM_FRAMES) -> np.ndarray:
+    """
+    Returns the [start, stop) frame ranges, as an (N, 2) array, where the alarm condition held for at least
+    min_frames consecutive frames.
+    """
+    edges = np.diff(np.concatenate(([0], active.astype(np.int8), [0])))
+    starts = np.flatnonzero(edges == 1)
+    stops = np.flatnonzero(edges == -1)
+    is_long_enough = stops - starts >= min_frames
+    return np.stack((starts[is_long_enough], stops[is_long_enough]), axis=1).astype(np.int64)
+
+
+def analyze_session(source_path: str,
+                    output_path: str,
+                    rois: tuple = (),
+                    alarm_high: float = None,
+                    alarm_low: float = None,
+                    alarm_frames: int = BATCH_ALARM_FRAMES,
+                    block_frames: int = BATCH_BLOCK_FRAMES) -> dict:
+    """
+    Analyzes a whole recording and writes the per-frame results as columns to output_path (.npz).
+    High alarms evaluate the maximum temperature, low alarms the minimum, and the same for each region of interest.
+    The output is written to a temporary file and then moved into place, so it either exists complete or not at all.
+    Returns a short summary of the session.
+    """
+    start_time = time.perf_counter()
+    blocks: dict[str, list] = {}
+    with open_recording(source_path) as recording:
+        if not recording.frame_count:
+            raise ValueError(f"{source_path} does not contain any frames")
+        for name, x, y, roi_width, roi_height in rois:
+            if x < 0 or y < 0 or x + roi_width > recording.width or y + roi_height > recording.height:
+                raise ValueError(f"Region of interest {name} does not fit the {recording.width}x{recording.height} "
+                                 f"frames of {source_path}")
+
+        for _, block in iter_blocks(recording, block_frames):
+            for column, values in block_statistics(block, rois).items():
+                blocks.setdefault(column, []).append(values)
+        frame_count, fps, width, height = recording.frame_count, recording.fps, recording.width, recording.height
+
+    columns = {column: np.concatenate(values) for column, values in blocks.items()}
+    columns["frame"] = np.arange(frame_count, dtype=np.int32)
+    columns["time"] = (columns["frame"] / fps).astype(np.float32)
+
+    # Alarms, for the whole frame and each region of interest
+    alarm_count = 0
+    series = [("", columns["maximum_temperature"], columns["minimum_temperature"])]
+    series += [(f"roi_{name}_", columns[f"roi_{name}_maximum"], columns[f"roi_{name}_minimum"]) for name, *_ in rois]
+    for prefix, maximum, minimum in series:
+        if alarm_high is not None:
+            events = find_alarm_events(maximum > alarm_high, alarm_frames)
+            columns[f"{prefix}alarm_high_events"] = events
+            alarm_count += len(events)
+        if alarm_low is not None:
+            events = find_alarm_events(minimum < alarm_low, alarm_frames)
+            columns[f"{prefix}alarm_low_events"] = events
+            alarm_count += len(events)
+
+    parameters = {"rois": [list(roi) for roi in rois], "alarm_high": alarm_high, "alarm_low": alarm_low,
+                  "alarm_frames": alarm_frames}
+    temp_path = f"{output_path}.tmp"
+    with open(temp_path, "wb") as f:
+        np.savez_compressed(
+            f,
+            source=np.array(os.path.abspath(source_path)),
+            parameters=np.array(json.dumps(parameters)),
+            fps=np.array(fps),
+            width=np.array(width),
+            height=np.array(height),
+            **columns)
+    os.replace(temp_path, output_path)
+
+    return {
+        "source": source_path,
+        "output": output_path,
+        "frames": frame_count,
+        "seconds": time.perf_counter() - start_time,
+        "maximum_temperature": float(columns["maximum_temperature"].max()),
+        "minimum_temperature": float(columns["minimum_temperature"].min()),
+        "alarms": alarm_count}
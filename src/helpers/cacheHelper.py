@@ -0,0 +1,134 @@
+import threading
+from collections import OrderedDict
+
+
+class LruCache:
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.hits: int = 0
+        self.misses: int = 0
+
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for the key (marking it as most recently used), or the default.
+        """
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Stores a value, evicting the least recently used entries beyond the capacity.
+        """
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """
+        Drops all cached values.
+        """
+        with self._lock:
+            self._entries.clear()
+
+
+class PrefetchingFrameCache:
+    def __init__(self, loader, frame_count: int, capacity: int, prefetch_count: int):
+        """
+        Caches frames produced by loader(index) and reads ahead on a background thread.
+        The loader is never called concurrently, so it does not need to be thread safe.
+        """
+        self.frame_count = frame_count
+        self.prefetch_count = min(prefetch_count, max(capacity - 1, 0))
+
+        self._loader = loader
+        self._cache = LruCache(capacity)
+        self._loader_lock = threading.Lock()
+
+        # Only the most recent prefetch request matters, older ones are superseded
+        self._request = None
+        self._request_ready = threading.Condition()
+        self._is_running = True
+        self._worker = threading.Thread(target=self._prefetch_worker, daemon=True)
+        self._worker.start()
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def _load(self, index: int):
+        with self._loader_lock:
+            # The other thread may have loaded it while we waited for the lock
+            if index in self._cache:
+                return self._cache.get(index)
+            value = self._loader(index)
+            self._cache.put(index, value)
+            return value
+
+    def get(self, index: int):
+        """
+        Returns the frame at the index, loading it on the calling thread on a cache miss.
+        """
+        value = self._cache.get(index)
+        if value is None:
+            value = self._load(index)
+        return value
+
+    def prefetch(self, index: int, direction: int = 1):
+        """
+        Requests the frames following the index in the direction of playback to be loaded in the background.
+        """
+        with self._request_ready:
+            self._request = (index, direction)
+            self._request_ready.notify()
+
+    def _prefetch_worker(self):
+        while True:
+            with self._request_ready:
+                while self._request is None and self._is_running:
+                    self._request_ready.wait()
+                if not self._is_running:
+                    return
+                index, direction = self._request
+                self._request = None
+
+            for step in range(1, self.prefetch_count + 1):
+                target = index + direction * step
+                if not 0 <= target < self.frame_count:
+                    break
+                # Abandon this read-ahead as soon as playback asks for something else
+                if self._request is not None or not self._is_running:
+                    break
+                if target not in self._cache:
+                    self._load(target)
+
+    def close(self):
+        """
+        Stops the prefetch thread and drops the cached frames.
+        """
+        with self._request_ready:
+            self._is_running = False
+            self._request_ready.notify()
+        self._worker.join()
+        self._cache.clear()
@@ -0,0 +1,97 @@
+import numpy as np
+
+from defaults.values import *
+
+
+class ChangeDetector:
+    def __init__(self,
+                 width: int = SENSOR_WIDTH,
+                 height: int = SENSOR_HEIGHT,
+                 block_size: int = CHANGE_BLOCK_SIZE,
+                 subsample: int = CHANGE_SUBSAMPLE,
+                 threshold: int = CHANGE_THRESHOLD):
+        """
+        Detects whether a raw thermal plane differs meaningfully from the last one that was processed.
+        Every `subsample`th pixel is compared against the reference frame, and the largest raw difference within
+        each block of block_size x block_size pixels decides whether that block is dirty.
+        """
+        self.width = width
+        self.height = height
+        self.block_size = block_size
+        self.subsample = subsample
+        self.threshold = threshold
+
+        # Block boundaries within the subsampled plane
+        step = max(block_size // subsample, 1)
+        self._row_starts = np.arange(0, -(-height // subsample), step)
+        self._col_starts = np.arange(0, -(-width // subsample), step)
+
+        # Subsampled copy of the last processed (changed) frame
+        self._reference = None
+
+        # Dirty blocks of the last update, True where the block changed
+        self.dirty_blocks = np.ones((len(self._row_starts), len(self._col_starts)), dtype=bool)
+
+        # Skip accounting
+        self.frame_count: int = 0
+        self.unchanged_count: int = 0
+
+    @property
+    def skip_rate(self) -> float:
+        return self.unchanged_count / self.frame_count if self.frame_count else 0.0
+
+    def reset(self):
+        """
+        Forgets the reference frame, so the next update is reported as changed.
+        """
+        self._reference = None
+
+    def update(self, thdata) -> bool:
+        """
+        Compares the thermal plane to the reference and returns whether it changed.
+        A changed frame becomes the new reference, an unchanged one is counted as skipped.
+        """
+        self.frame_count += 1
+        sample = thdata[::self.subsample, ::self.subsample].astype(np.int32)
+
+        if self._reference is None:
+            self.dirty_blocks[:] = True
+        else:
+            difference = np.abs(sample - self._reference)
+            block_difference = np.maximum.reduceat(
+                np.maximum.reduceat(difference, self._row_starts, axis=0), self._col_starts, axis=1)
+            self.dirty_blocks = block_difference > self.threshold
+
+            if not self.dirty_blocks.any():
+                self.unchanged_count += 1
+                return False
+
+        self._reference = sample
+        return True
+
+    def get_dirty_regions(self) -> list[tuple[int, int, int, int]]:
+        """
+        Returns the dirty blocks of the last update as (x, y, width, height) rectangles in sensor pixels.
+        """
+        regions = []
+        for block_row, block_col in zip(*np.nonzero(self.dirty_blocks)):
+            x, y = int(block_col) * self.block_size, int(block_row) * self.block_size
+            regions.append((x, y, min(self.block_size, self.width - x), min(self.block_size, self.height - y)))
+        return regions
+
+    def get_dirty_bounds(self):
+        """
+        Returns the bounding (x, y, width, height) rectangle of all dirty blocks in sensor pixels, or None.
+        """
+        rows, cols = np.nonzero(self.dirty_blocks)
+        if not len(rows):
+            return None
+        x, y = int(cols.min()) * self.block_size, int(rows.min()) * self.block_size
+        return (x,
+                y,
+                min((int(cols.max()) + 1) * self.block_size, self.width) - x,
+                min((int(rows.max()) + 1) * self.block_size, self.height) - y)
+
+    def __str__(self):
+        return f'Change detection: {self.unchanged_count}/{self.frame_count} frames unchanged ' \
+               f'({self.skip_rate * 100:.1f}% skipped)'
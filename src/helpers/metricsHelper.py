@@ -0,0 +1,222 @@
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from defaults.values import *
+
+
+class Histogram:
+    def __init__(self, bounds: tuple = METRICS_HISTOGRAM_BOUNDS):
+        """
+        Fixed-size histogram of durations in seconds, memory use does not grow with the number of observations.
+        """
+        self.bounds = bounds
+        self.counts: list[int] = [0] * (len(bounds) + 1)
+        self.count: int = 0
+        self.sum: float = 0.0
+        self.max: float = 0.0
+
+    def observe(self, value: float):
+        """
+        Adds a single observation.
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, percent: float) -> float:
+        """
+        Returns the upper bound of the bucket containing the percentile (the maximum for the overflow bucket).
+        """
+        if not self.count:
+            return 0.0
+        target = self.count * percent / 100
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return self.max
+
+    def to_prometheus(self, name: str, labels: str = "") -> list[str]:
+        """
+        Returns the histogram in the Prometheus text exposition format.
+        """
+        separator = "," if labels else ""
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.bounds, self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels}{separator}le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{labels}{separator}le="+Inf"}} {self.count}')
+        label_set = f'{{{labels}}}' if labels else ""
+        lines.append(f'{name}_sum{label_set} {self.sum:.6f}')
+        lines.append(f'{name}_count{label_set} {self.count}')
+        return lines
+
+
+class FrameMetrics:
+    def __init__(self, fps: int = DEVICE_FPS, drop_tolerance: float = METRICS_DROP_TOLERANCE):
+        """
+        Capture timing, frame drop accounting, latency and per-stage timings of the capture loop.
+        All timestamps come from time.perf_counter(), which is monotonic and high resolution on every platform.
+        """
+        self.frame_interval = 1 / fps
+        self.drop_tolerance = drop_tolerance
+
+        # Current frame
+        self.sequence: int = -1
+        self.capture_time: float = 0.0
+        self._stage_start: float = 0.0
+
+        # Counters
+        self.frame_count: int = 0
+        self.dropped_frames: int = 0
+        self.late_frames: int = 0
+        self.unchanged_frames: int = 0
+        self.fps: float = 0.0
+
+        # Histograms
+        self.frame_intervals = Histogram()
+        self.latency = Histogram()
+        self.stages: dict[str, Histogram] = {}
+
+        self._start_time = time.perf_counter()
+
+    def on_capture(self) -> tuple[int, float]:
+        """
+        Stamps a frame as it leaves the capture, and accounts for any frames dropped since the last one.
+        Returns the frame's sequence number and capture time.
+        """
+        now = time.perf_counter()
+        if self.frame_count:
+            interval = now - self.capture_time
+            self.frame_intervals.observe(interval)
+            self.fps += METRICS_FPS_SMOOTHING * (1 / max(interval, 1e-6) - self.fps)
+            if interval > self.drop_tolerance * self.frame_interval:
+                missed = max(round(interval / self.frame_interval) - 1, 1)
+                self.dropped_frames += missed
+                self.sequence += missed
+        else:
+            self.fps = 1 / self.frame_interval
+
+        self.sequence += 1
+        self.frame_count += 1
+        self.capture_time = now
+        self._stage_start = now
+        return self.sequence, self.capture_time
+
+    def end_stage(self, name: str):
+        """
+        Records the time since the previous stage ended (or the frame was captured) under the stage name.
+        """
+        now = time.perf_counter()
+        self.observe_stage(name, now - self._stage_start)
+        self._stage_start = now
+
+    def observe_stage(self, name: str, duration: float):
+        """
+        Records a duration in seconds under the stage name.
+        """
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = self.stages[name] = Histogram()
+        stage.observe(duration)
+
+    def on_displayed(self):
+        """
+        Records the capture-to-display latency of the current frame. Call once the window has repainted.
+        """
+        latency = time.perf_counter() - self.capture_time
+        self.latency.observe(latency)
+        if latency > self.frame_interval:
+            self.late_frames += 1
+
+    def get_hud_lines(self) -> list[str]:
+        """
+        Returns short summary lines for the HUD.
+        """
+        return [
+            f'FPS: {self.fps:.1f} Drop: {self.dropped_frames}',
+            f'Lat: {self.latency.mean * 1000:.0f}ms p99<{self.latency.percentile(99) * 1000:.0f}ms']
+
+    def to_prometheus(self, prefix: str = METRICS_PREFIX) -> str:
+        """
+        Returns all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+
+        def add(name: str, kind: str, help_text: str, values: list[str]):
+            lines.append(f'# HELP {prefix}_{name} {help_text}')
+            lines.append(f'# TYPE {prefix}_{name} {kind}')
+            lines.extend(values)
+
+        add('uptime_seconds', 'gauge', 'Seconds since the metrics were started.',
+            [f'{prefix}_uptime_seconds {time.perf_counter() - self._start_time:.3f}'])
+        add('frames_total', 'counter', 'Frames captured.', [f'{prefix}_frames_total {self.frame_count}'])
+        add('frames_dropped_total', 'counter', 'Frames missed, detected from inter-frame gaps.',
+            [f'{prefix}_frames_dropped_total {self.dropped_frames}'])
+        add('frames_late_total', 'counter', 'Frames whose capture-to-display latency exceeded the frame interval.',
+            [f'{prefix}_frames_late_total {self.late_frames}'])
+        add('frames_unchanged_total', 'counter', 'Frames skipped by change detection.',
+            [f'{prefix}_frames_unchanged_total {self.unchanged_frames}'])
+        add('fps', 'gauge', 'Smoothed capture frame rate.', [f'{prefix}_fps {self.fps:.3f}'])
+        add('frame_interval_seconds', 'histogram', 'Time between captured frames.',
+            self.frame_intervals.to_prometheus(f'{prefix}_frame_interval_seconds'))
+        add('capture_to_display_seconds', 'histogram', 'Latency from capture to display.',
+            self.latency.to_prometheus(f'{prefix}_capture_to_display_seconds'))
+
+        stage_lines = []
+        for name, stage in list(self.stages.items()):
+            stage_lines += stage.to_prometheus(f'{prefix}_stage_seconds', f'stage="{name}"')
+        add('stage_seconds', 'histogram', 'Time spent in each processing stage.', stage_lines)
+
+        return '\n'.join(lines) + '\n'
+
+
+def write_metrics_file(path: str, text: str):
+    """
+    Writes the metrics atomically, so scrapers never read a partial file.
+    """
+    temp_path = f'{path}.tmp'
+    with open(temp_path, "w") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+class MetricsServer:
+    def __init__(self, metrics: FrameMetrics, port: int, host: str = METRICS_HOST):
+        """
+        Serves the metrics as plain text over HTTP (at any path) from a background thread.
+        """
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = metrics.to_prometheus().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+
+    def close(self):
+        """
+        Stops serving.
+        """
+        self._server.shutdown()
+        self._server.server_close()
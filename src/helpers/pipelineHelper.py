@@ -0,0 +1,88 @@
+import time
+
+# Buffer names shared between stages
+BUFFER_RAW: str = "raw"  # Raw uint16 thermal plane
+BUFFER_YUV: str = "yuv"  # The camera's own YUY2 image
+BUFFER_VIEW_RAW: str = "view_raw"  # Raw thermal plane cropped to the viewport
+BUFFER_DIRTY: str = "dirty"  # (x, y, width, height) sensor regions changed since the last processed frame
+BUFFER_CAMERA_IMAGE: str = "camera_image"  # 8-bit image before contrast/gain
+BUFFER_IMAGE: str = "image"  # 8-bit display image, overlays are drawn onto it in place
+BUFFER_CENTER_TEMPERATURE: str = "center_temperature"
+BUFFER_AVERAGE_TEMPERATURE: str = "average_temperature"
+BUFFER_MAXIMUM: str = "maximum"  # (temperature, row, col) of the hottest pixel
+BUFFER_MINIMUM: str = "minimum"  # (temperature, row, col) of the coldest pixel
+STATISTICS_BUFFERS: tuple = (BUFFER_CENTER_TEMPERATURE, BUFFER_AVERAGE_TEMPERATURE, BUFFER_MAXIMUM, BUFFER_MINIMUM)
+
+
+class Stage:
+    """
+    A processing step that reads its input buffers and writes its output buffers.
+    A stage that lists a buffer as both input and output modifies it in place.
+    """
+    name: str = "stage"
+    inputs: tuple = ()
+    outputs: tuple = ()
+
+    def is_enabled(self) -> bool:
+        """
+        Whether the stage takes part in the next build, disabled stages cost nothing per frame.
+        """
+        return True
+
+    def process(self, buffers: dict):
+        raise NotImplementedError
+
+
+class Pipeline:
+    def __init__(self, name: str, stages: list, outputs: tuple, sources: tuple, metrics=None):
+        """
+        Runs the stages needed to produce the requested output buffers, in the order they were given.
+        Buffers not produced by any stage must come from the sources (put into the buffers before running).
+        If metrics (FrameMetrics) are given, every stage is timed as "<pipeline name>.<stage name>".
+        """
+        self.name = name
+        self.stages = stages
+        self.outputs = outputs
+        self.sources = sources
+        self.metrics = metrics
+
+        # Build results
+        self.plan: list = []
+        self.required_sources: set = set()
+        self._stage_names: list[str] = []
+
+    def build(self):
+        """
+        Plans the stages to run: disabled stages and stages whose outputs nothing consumes are pruned.
+        """
+        needed = set(self.outputs)
+        plan = []
+        for stage in reversed(self.stages):
+            if not stage.is_enabled() or needed.isdisjoint(stage.outputs):
+                continue
+            plan.append(stage)
+            needed.difference_update(output for output in stage.outputs if output not in stage.inputs)
+            needed.update(stage.inputs)
+
+        missing = needed.difference(self.sources)
+        if missing:
+            raise ValueError(f"No enabled stage of the {self.name} pipeline provides {', '.join(sorted(missing))}")
+
+        self.plan = plan[::-1]
+        self.required_sources = needed
+        self._stage_names = [f'{self.name}.{stage.name}' for stage in self.plan]
+
+    def run(self, buffers: dict) -> dict:
+        """
+        Runs the planned stages on the buffers, which are updated in place and returned.
+        """
+        if self.metrics is None:
+            for stage in self.plan:
+                stage.process(buffers)
+            return buffers
+
+        for stage, stage_name in zip(self.plan, self._stage_names):
+            start = time.perf_counter()
+            stage.process(buffers)
+            self.metrics.observe_stage(stage_name, time.perf_counter() - start)
+        return buffers
@@ -0,0 +1,104 @@
+import os
+import struct
+import numpy as np
+
+from defaults.values import SENSOR_WIDTH, SENSOR_HEIGHT, DEVICE_FPS
+
+# Uncompressed capture format: a fixed header followed by back-to-back little-endian uint16 thermal planes
+RAW_MAGIC: bytes = b"TCRW"
+RAW_VERSION: int = 1
+RAW_HEADER = struct.Struct("<4sHHHH4x")
+RAW_DTYPE = np.dtype("<u2")
+
+
+class RawRecordingWriter:
+    def __init__(self,
+                 path: str,
+                 width: int = SENSOR_WIDTH,
+                 height: int = SENSOR_HEIGHT,
+                 fps: int = DEVICE_FPS):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.frame_count: int = 0
+
+        self._file = open(self.path, "wb")
+        self._file.write(RAW_HEADER.pack(RAW_MAGIC, RAW_VERSION, self.width, self.height, self.fps))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, thdata):
+        """
+        Appends a single thermal plane to the recording.
+        """
+        if thdata.shape != (self.height, self.width):
+            raise ValueError(f"Expected a {self.height}x{self.width} thermal plane, got {thdata.shape}")
+        self._file.write(np.ascontiguousarray(thdata, dtype=RAW_DTYPE).tobytes())
+        self.frame_count += 1
+
+    def close(self):
+        """
+        Flushes and closes the recording file.
+        """
+        if not self._file.closed:
+            self._file.close()
+
+
+class RawRecordingReader:
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(self.path, "rb") as f:
+            header = f.read(RAW_HEADER.size)
+        if len(header) != RAW_HEADER.size:
+            raise ValueError(f"{self.path} is too short to be a raw thermal recording")
+        magic, version, self.width, self.height, self.fps = RAW_HEADER.unpack(header)
+        if magic != RAW_MAGIC or version != RAW_VERSION:
+            raise ValueError(f"{self.path} is not a raw thermal recording")
+
+        # A recording that is still being written (or was cut short) may end on a partial frame, ignore it
+        self.frame_size: int = self.width * self.height * RAW_DTYPE.itemsize
+        self.frame_count: int = (os.path.getsize(self.path) - RAW_HEADER.size) // self.frame_size
+
+        self.frames = np.memmap(
+            self.path,
+            dtype=RAW_DTYPE,
+            mode="r",
+            offset=RAW_HEADER.size,
+            shape=(self.frame_count, self.height, self.width)) if self.frame_count else \
+            np.empty((0, self.height, self.width), dtype=RAW_DTYPE)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.frame_count
+
+    def read_frame(self, index: int):
+        """
+        Returns the thermal plane at the given frame index.
+        """
+        if not 0 <= index < self.frame_count:
+            raise IndexError(f"Frame {index} is out of range for {self.frame_count} frames")
+        return np.array(self.frames[index])
+
+    def iter_frames(self, start: int = 0):
+        """
+        Yields the thermal planes in order, starting at the given frame index.
+        """
+        for index in range(start, self.frame_count):
+            yield np.array(self.frames[index])
+
+    def close(self):
+        """
+        Releases the memory map of the recording (once no slices of it are still referenced).
+        """
+        self.frames = None
@@ -0,0 +1,217 @@
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+import numpy as np
+
+from defaults.values import *
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+def get_rss_bytes():
+    """
+    Returns the resident set size of this process in bytes, or None if it cannot be determined.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def get_open_handle_count():
+    """
+    Returns the number of open file descriptors (handles on Windows), or None if it cannot be determined.
+    """
+    if psutil is not None:
+        process = psutil.Process()
+        return process.num_handles() if sys.platform == "win32" else process.num_fds()
+    try:
+        return len(os.listdir("/proc/self/fd"))
+    except OSError:
+        return None
+
+
+class SoakMonitor:
+    def __init__(self,
+                 expected_duration: float = SOAK_DURATION,
+                 sample_interval: float = SOAK_SAMPLE_INTERVAL,
+                 warmup_fraction: float = SOAK_WARMUP_FRACTION,
+                 use_tracemalloc: bool = True,
+                 top_count: int = SOAK_TOP_ALLOCATORS):
+        """
+        Samples process resources while a soak test runs, and reports growth trends at the end.
+        on_frame() must be called once per processed frame.
+        """
+        self.expected_duration = expected_duration
+        self.sample_interval = sample_interval
+        self.warmup_fraction = warmup_fraction
+        self.use_tracemalloc = use_tracemalloc
+        self.top_count = top_count
+
+        # Samples: (elapsed seconds, frames, rss bytes, traced bytes, allocated blocks, open handles, gc objects)
+        self.samples: list[tuple] = []
+        self.frame_count: int = 0
+
+        # Net allocated blocks per frame (allocations not freed again within the frame)
+        self.max_frame_block_delta: int = 0
+        self._frame_block_delta_total: int = 0
+        self._last_blocks: int = 0
+
+        self._start_time: float = 0.0
+        self._next_sample_time: float = 0.0
+        self._baseline_snapshot = None
+        self._final_snapshot = None
+
+    def start(self):
+        """
+        Starts monitoring, call right before the soak loop.
+        """
+        if self.use_tracemalloc:
+            tracemalloc.start()
+        self._start_time = time.monotonic()
+        self._next_sample_time = self._start_time
+        self._last_blocks = sys.getallocatedblocks()
+        self.sample()
+
+    def on_frame(self):
+        """
+        Accounts one processed frame and takes a sample when one is due.
+        """
+        self.frame_count += 1
+        blocks = sys.getallocatedblocks()
+        delta = blocks - self._last_blocks
+        self._last_blocks = blocks
+        self._frame_block_delta_total += delta
+        if delta > self.max_frame_block_delta:
+            self.max_frame_block_delta = delta
+
+        if time.monotonic() >= self._next_sample_time:
+            self.sample()
+
+    def sample(self):
+        """
+        Records the current resource usage.
+        """
+        now = time.monotonic()
+        traced = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+        self.samples.append((
+            now - self._start_time,
+            self.frame_count,
+            get_rss_bytes(),
+            traced,
+            sys.getallocatedblocks(),
+            get_open_handle_count(),
+            len(gc.get_objects())))
+        self._next_sample_time = now + self.sample_interval
+
+        # The allocator baseline is taken once the warmup is over, so caches filling up are not reported
+        if self.use_tracemalloc and self._baseline_snapshot is None and len(self.samples) > 1 and \
+                now - self._start_time >= self.warmup_fraction * self.expected_duration:
+            self._baseline_snapshot = tracemalloc.take_snapshot()
+
+    def stop(self):
+        """
+        Takes the final sample and allocator snapshot, call right after the soak loop.
+        """
+        self.sample()
+        if self.use_tracemalloc:
+            self._final_snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+
+    def get_top_allocators(self) -> list[tuple[str, int, int]]:
+        """
+        Returns the code locations whose retained memory grew the most since the end of the warmup,
+        as (location, size growth in bytes, count growth).
+        """
+        if self._baseline_snapshot is None or self._final_snapshot is None:
+            return []
+        snapshot_filter = (tracemalloc.Filter(False, tracemalloc.__file__),)
+        difference = self._final_snapshot.filter_traces(snapshot_filter).compare_to(
+            self._baseline_snapshot.filter_traces(snapshot_filter), "lineno")
+        return [(str(stat.traceback[0]), stat.size_diff, stat.count_diff)
+                for stat in difference[:self.top_count] if stat.size_diff > 0]
+
+    def _get_post_warmup_samples(self) -> list[tuple]:
+        return [s for s in self.samples if s[0] >= self.warmup_fraction * self.samples[-1][0]]
+
+    def get_trends(self) -> dict:
+        """
+        Returns the growth of each sampled metric after the warmup, as a least-squares slope per hour.
+        """
+        samples = self._get_post_warmup_samples()
+        trends = {}
+        if len(samples) < 3:
+            return trends
+        elapsed_hours = np.array([s[0] for s in samples]) / 3600
+        for column, name in enumerate(SOAK_METRICS, start=2):
+            values = [s[column] for s in samples]
+            if any(v is None for v in values) or elapsed_hours[-1] == elapsed_hours[0]:
+                continue
+            trends[name] = float(np.polyfit(elapsed_hours, np.array(values, dtype=np.float64), 1)[0])
+        return trends
+
+    def get_flags(self) -> list[str]:
+        """
+        Returns a description of every metric whose growth exceeds its limits.
+        """
+        samples = self._get_post_warmup_samples()
+        hours = (samples[-1][0] - samples[0][0]) / 3600 if samples else 0.0
+        flags = []
+        for name, slope in self.get_trends().items():
+            if slope > SOAK_GROWTH_LIMITS[name] and slope * hours > SOAK_GROWTH_MINIMUMS[name]:
+                flags.append(f'{name} grows by {slope:,.0f}/hour ({slope * hours:+,.0f} after warmup, '
+                             f'limit {SOAK_GROWTH_LIMITS[name]:,}/hour)')
+        return flags
+
+    def report(self) -> str:
+        """
+        Returns a human readable soak test report.
+        """
+        first, last = self.samples[0], self.samples[-1]
+        elapsed = last[0]
+        lines = [
+            'Soak test report',
+            f'Duration: {time.strftime("%H:%M:%S", time.gmtime(elapsed))}, {self.frame_count} frames '
+            f'({self.frame_count / elapsed if elapsed else 0:.1f} FPS), {len(self.samples)} samples',
+            f'Net allocated blocks per frame: {self._frame_block_delta_total / max(self.frame_count, 1):.2f} '
+            f'average, {self.max_frame_block_delta} max',
+            '',
+            f'{"Metric":<20}{"Start":>18}{"End":>18}{"Trend/hour":>18}']
+        trends = self.get_trends()
+        for column, name in enumerate(SOAK_METRICS, start=2):
+            start_value = "n/a" if first[column] is None else f'{first[column]:,}'
+            end_value = "n/a" if last[column] is None else f'{last[column]:,}'
+            trend = f'{trends[name]:+,.0f}' if name in trends else "n/a"
+            lines.append(f'{name:<20}{start_value:>18}{end_value:>18}{trend:>18}')
+
+        top_allocators = self.get_top_allocators()
+        if top_allocators:
+            lines += ['', 'Top growing allocators since warmup:']
+            lines += [f'  {size:+,} B ({count:+,} blocks)  {location}' for location, size, count in top_allocators]
+
+        flags = self.get_flags()
+        lines += ['', 'Growth flagged:' if flags else 'No growth trends flagged.']
+        lines += [f'  {flag}' for flag in flags]
+        return '\n'.join(lines)
+
+    def save_samples(self, path: str):
+        """
+        Writes the raw samples and trends as JSON, for plotting or comparing runs.
+        """
+        with open(path, "w") as f:
+            json.dump({
+                "columns": ["elapsed_seconds", "frames", *SOAK_METRICS],
+                "samples": self.samples,
+                "trends_per_hour": self.get_trends(),
+                "flags": self.get_flags(),
+                "top_allocators": self.get_top_allocators(),
+            }, f, indent=1)
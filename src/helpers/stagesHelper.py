@@ -0,0 +1,223 @@
+import cv2
+
+from enums.ColormapEnum import Colormap
+from helpers.pipelineHelper import *
+from helpers.statisticsHelper import calculate_block_statistics
+
+
+# STATISTICS STAGES
+# These keep the controller's own statistics attributes up to date as well, for anything still reading them.
+
+class StatisticsStage(Stage):
+    name = "frame_statistics"
+    inputs = (BUFFER_RAW,)
+    outputs = (BUFFER_CENTER_TEMPERATURE, BUFFER_AVERAGE_TEMPERATURE, BUFFER_MAXIMUM, BUFFER_MINIMUM)
+
+    def __init__(self, controller):
+        self.controller = controller
+
+    def process(self, buffers: dict):
+        # The block statistics of a single frame, all statistics come out of one pass over the data
+        statistics = calculate_block_statistics(buffers[BUFFER_RAW])
+        controller = self.controller
+        controller._raw_temp = statistics.center_raw[0]
+        controller._temp = statistics.center_temperature[0]
+        controller._avg_temp = statistics.average_temperature[0]
+        controller._max_temp = statistics.maximum_temperature[0]
+        controller._min_temp = statistics.minimum_temperature[0]
+        # The controller's names are swapped: _mrow/_lrow hold the x coordinate and _mcol/_lcol the y coordinate
+        controller._mrow, controller._mcol = int(statistics.maximum_x[0]), int(statistics.maximum_y[0])
+        controller._lrow, controller._lcol = int(statistics.minimum_x[0]), int(statistics.minimum_y[0])
+
+        buffers[BUFFER_CENTER_TEMPERATURE] = controller._temp
+        buffers[BUFFER_AVERAGE_TEMPERATURE] = controller._avg_temp
+        buffers[BUFFER_MAXIMUM] = (controller._max_temp, controller._mrow, controller._mcol)
+        buffers[BUFFER_MINIMUM] = (controller._min_temp, controller._lrow, controller._lcol)
+
+
+# RENDER STAGES
+# Stages that produce an image keep their output buffer and pass it back to OpenCV as the destination, so it is
+# only reallocated when its size changes.
+
+class GuiStage(Stage):
+    def __init__(self, gui):
+        self.gui = gui
+        self._buffer = None
+
+
+class CameraImageStage(GuiStage):
+    name = "camera_image"
+    inputs = (BUFFER_YUV,)
+    outputs = (BUFFER_CAMERA_IMAGE,)
+
+    def process(self, buffers: dict):
+        self._buffer = cv2.cvtColor(buffers[BUFFER_YUV], cv2.COLOR_YUV2RGB_YUY2, self._buffer)
+        buffers[BUFFER_CAMERA_IMAGE] = self._buffer
+
+
+class ThermalImageStage(GuiStage):
+    name = "thermal_image"
+    inputs = (BUFFER_RAW,)
+    outputs = (BUFFER_CAMERA_IMAGE,)
+
+    def process(self, buffers: dict):
+        buffers[BUFFER_CAMERA_IMAGE] = self.gui.thermal_to_image(buffers[BUFFER_RAW])
+
+
+class ViewportStage(GuiStage):
+    name = "viewport"
+    inputs = (BUFFER_CAMERA_IMAGE,)
+    outputs = (BUFFER_CAMERA_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return self.gui.zoom > 1
+
+    def process(self, buffers: dict):
+        buffers[BUFFER_CAMERA_IMAGE] = self.gui.crop(buffers[BUFFER_CAMERA_IMAGE])
+
+
+class RawViewportStage(GuiStage):
+    name = "raw_viewport"
+    inputs = (BUFFER_RAW,)
+    outputs = (BUFFER_VIEW_RAW,)
+
+    def process(self, buffers: dict):
+        buffers[BUFFER_VIEW_RAW] = self.gui.crop(buffers[BUFFER_RAW])
+
+
+class ContrastStage(GuiStage):
+    name = "contrast"
+    inputs = (BUFFER_CAMERA_IMAGE,)
+    outputs = (BUFFER_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return not self.gui.agc.is_enabled
+
+    def process(self, buffers: dict):
+        self._buffer = self.gui.apply_contrast(buffers[BUFFER_CAMERA_IMAGE], self._buffer)
+        buffers[BUFFER_IMAGE] = self._buffer
+
+
+class AgcStage(GuiStage):
+    name = "agc"
+    inputs = (BUFFER_VIEW_RAW,)
+    outputs = (BUFFER_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return self.gui.agc.is_enabled
+
+    def process(self, buffers: dict):
+        buffers[BUFFER_IMAGE] = self.gui.agc.apply(buffers[BUFFER_VIEW_RAW])
+
+
+class ScaleStage(GuiStage):
+    name = "scale"
+    inputs = (BUFFER_IMAGE,)
+    outputs = (BUFFER_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return self.gui.scale != 1 or self.gui.zoom > 1
+
+    def process(self, buffers: dict):
+        self._buffer = self.gui.apply_scaling(buffers[BUFFER_IMAGE], self._buffer)
+        buffers[BUFFER_IMAGE] = self._buffer
+
+
+class BlurStage(GuiStage):
+    name = "blur"
+    inputs = (BUFFER_IMAGE,)
+    outputs = (BUFFER_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return self.gui.blur_radius > 0
+
+    def process(self, buffers: dict):
+        self._buffer = self.gui.apply_blur(buffers[BUFFER_IMAGE], self._buffer)
+        buffers[BUFFER_IMAGE] = self._buffer
+
+
+class InvertStage(GuiStage):
+    name = "invert"
+    inputs = (BUFFER_IMAGE,)
+    outputs = (BUFFER_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return self.gui.is_inverted
+
+    def process(self, buffers: dict):
+        cv2.bitwise_not(buffers[BUFFER_IMAGE], buffers[BUFFER_IMAGE])
+
+
+class ColormapStage(GuiStage):
+    name = "colormap"
+    inputs = (BUFFER_IMAGE,)
+    outputs = (BUFFER_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return self.gui.colormap != Colormap.NONE
+
+    def process(self, buffers: dict):
+        self._buffer = self.gui.apply_colormap(buffers[BUFFER_IMAGE], self._buffer)
+        buffers[BUFFER_IMAGE] = self._buffer
+
+
+class CrosshairsStage(GuiStage):
+    name = "crosshairs"
+    inputs = (BUFFER_IMAGE,)
+    outputs = (BUFFER_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return self.gui.is_in_viewport(self.gui.width // 2, self.gui.height // 2)
+
+    def process(self, buffers: dict):
+        self.gui.draw_crosshairs(buffers[BUFFER_IMAGE])
+
+
+class CenterTemperatureLabelStage(GuiStage):
+    name = "center_temperature_label"
+    inputs = (BUFFER_IMAGE, BUFFER_CENTER_TEMPERATURE)
+    outputs = (BUFFER_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return self.gui.is_in_viewport(self.gui.width // 2, self.gui.height // 2)
+
+    def process(self, buffers: dict):
+        self.gui.draw_temp(buffers[BUFFER_IMAGE], buffers[BUFFER_CENTER_TEMPERATURE])
+
+
+class HudStage(GuiStage):
+    name = "hud"
+    inputs = (BUFFER_IMAGE, BUFFER_AVERAGE_TEMPERATURE)
+    outputs = (BUFFER_IMAGE,)
+
+    def is_enabled(self) -> bool:
+        return self.gui.is_hud_visible
+
+    def process(self, buffers: dict):
+        self.gui.draw_hud(buffers[BUFFER_IMAGE], buffers[BUFFER_AVERAGE_TEMPERATURE], self.gui.is_recording)
+
+
+class MaximumLabelStage(GuiStage):
+    name = "maximum_label"
+    inputs = (BUFFER_IMAGE, BUFFER_MAXIMUM, BUFFER_AVERAGE_TEMPERATURE)
+    outputs = (BUFFER_IMAGE,)
+
+    def process(self, buffers: dict):
+        # Display floating max temp
+        max_temp, mrow, mcol = buffers[BUFFER_MAXIMUM]
+        is_hot = max_temp > buffers[BUFFER_AVERAGE_TEMPERATURE] + self.gui.threshold
+        if is_hot and self.gui.is_in_viewport(mrow, mcol):
+            self.gui.draw_max_temp(buffers[BUFFER_IMAGE], mrow, mcol, max_temp)
+
+
+class MinimumLabelStage(GuiStage):
+    name = "minimum_label"
+    inputs = (BUFFER_IMAGE, BUFFER_MINIMUM, BUFFER_AVERAGE_TEMPERATURE)
+    outputs = (BUFFER_IMAGE,)
+
+    def process(self, buffers: dict):
+        # Display floating min temp
+        min_temp, lrow, lcol = buffers[BUFFER_MINIMUM]
+        is_cold = min_temp < buffers[BUFFER_AVERAGE_TEMPERATURE] - self.gui.threshold
+        if is_cold and self.gui.is_in_viewport(lrow, lcol):
+            self.gui.draw_min_temp(buffers[BUFFER_IMAGE], lrow, lcol, min_temp)
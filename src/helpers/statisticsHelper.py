@@ -0,0 +1,84 @@
+import numpy as np
+
+from defaults.values import *
+
+
+def normalize_temperature(raw_temp, d: int = 64, c: float = 273.15):
+    """
+    Normalizes/converts raw temperature data (a value or an array) using the formula found by LeoDJ.
+    Link: https://www.eevblog.com/forum/thermal-imaging/infiray-and-their-p2-pro-discussion/200/
+    """
+    return (raw_temp / d) - c
+
+
+def to_temperature(raw) -> np.ndarray:
+    """
+    Converts raw values to rounded temperatures, as they are displayed.
+    """
+    return np.round(normalize_temperature(np.asarray(raw, dtype=np.float64)), TEMPERATURE_SIG_DIGITS)
+
+
+class BlockStatistics:
+    def __init__(self, count: int):
+        """
+        Per-frame statistics of a block of thermal planes, one array element per frame.
+        Coordinates are (x, y) sensor pixels, temperatures are in C.
+        """
+        self.center_raw = np.empty(count, dtype=np.uint16)
+        self.center_temperature = np.empty(count)
+        self.average_temperature = np.empty(count)
+        self.maximum_temperature = np.empty(count)
+        self.minimum_temperature = np.empty(count)
+        self.maximum_x = np.empty(count, dtype=np.int16)
+        self.maximum_y = np.empty(count, dtype=np.int16)
+        self.minimum_x = np.empty(count, dtype=np.int16)
+        self.minimum_y = np.empty(count, dtype=np.int16)
+
+    def __len__(self):
+        return len(self.center_raw)
+
+    def as_columns(self) -> dict:
+        """
+        Returns the statistics by name, without the raw center values.
+        """
+        return {name: values for name, values in vars(self).items() if name != "center_raw"}
+
+
+def calculate_block_statistics(block, chunk_frames: int = STATISTICS_CHUNK_FRAMES) -> BlockStatistics:
+    """
+    Calculates the center, average, minimum and maximum temperatures (with the coordinates of the extremes) of every
+    frame of an (N, height, width) block of raw thermal planes, such as a slice of a recording's memory map.
+    A single (height, width) plane is treated as a block of one. Frames are reduced chunk_frames at a time, which
+    bounds the temporary memory for blocks that are not contiguous (e.g. crops) and keeps each chunk in cache.
+    """
+    if block.ndim == 2:
+        block = block[np.newaxis]
+    count, height, width = block.shape
+    statistics = BlockStatistics(count)
+
+    # Integer sums are exact and much faster than floating point means, use 32 bits where they cannot overflow
+    sum_dtype = np.uint32 if height * width * np.iinfo(block.dtype).max < 2 ** 32 else np.uint64
+    sums = np.empty(count, dtype=sum_dtype)
+    maxima = np.empty(count, dtype=block.dtype)
+    minima = np.empty(count, dtype=block.dtype)
+
+    for start in range(0, count, chunk_frames):
+        chunk = block[start:start + chunk_frames]
+        stop = start + len(chunk)
+        flat = chunk.reshape(len(chunk), -1)
+        frames = np.arange(len(chunk))
+
+        max_index = flat.argmax(axis=1)
+        min_index = flat.argmin(axis=1)
+        maxima[start:stop] = flat[frames, max_index]
+        minima[start:stop] = flat[frames, min_index]
+        statistics.maximum_y[start:stop], statistics.maximum_x[start:stop] = np.divmod(max_index, width)
+        statistics.minimum_y[start:stop], statistics.minimum_x[start:stop] = np.divmod(min_index, width)
+        np.add.reduce(flat, axis=1, dtype=sum_dtype, out=sums[start:stop])
+        statistics.center_raw[start:stop] = chunk[:, height // 2, width // 2]
+
+    statistics.center_temperature[:] = to_temperature(statistics.center_raw)
+    statistics.average_temperature[:] = to_temperature(sums / (height * width))
+    statistics.maximum_temperature[:] = to_temperature(maxima)
+    statistics.minimum_temperature[:] = to_temperature(minima)
+    return statistics
@@ -0,0 +1,84 @@
+import time
+import numpy as np
+
+from defaults.values import *
+
+
+class SyntheticCapture:
+    def __init__(self,
+                 width: int = SENSOR_WIDTH,
+                 height: int = SENSOR_HEIGHT,
+                 duration: float = None,
+                 max_frames: int = None,
+                 repeat_every: int = SOAK_REPEAT_EVERY,
+                 seed: int = 0):
+        """
+        Stands in for cv2.VideoCapture, producing frames in the camera's layout (YUY2 image data on top, raw
+        uint16 thermal data below, flattened into a single row) as fast as they are read.
+        A moving hotspot over a noisy background keeps every stage busy, and every `repeat_every`th frame
+        repeats the previous one to exercise the unchanged-frame path.
+        The capture closes itself once the duration (seconds) or max_frames is reached.
+        """
+        self.width = width
+        self.height = height
+        self.duration = duration
+        self.max_frames = max_frames
+        self.repeat_every = repeat_every
+        self.frame_count: int = 0
+
+        self._rng = np.random.default_rng(seed)
+        self._start_time = time.monotonic()
+        self._is_open = True
+
+        # Background at roughly 22 C, in raw units (1/64 K)
+        rows, cols = np.mgrid[0:height, 0:width]
+        self._rows, self._cols = rows, cols
+        self._background = ((22 + 273.15) * 64 + rows * 4 + cols * 2).astype(np.uint16)
+        self._frame = None
+
+    def isOpened(self) -> bool:
+        if self._is_open:
+            if self.max_frames is not None and self.frame_count >= self.max_frames:
+                self._is_open = False
+            if self.duration is not None and time.monotonic() - self._start_time >= self.duration:
+                self._is_open = False
+        return self._is_open
+
+    def _generate(self):
+        """
+        Builds the next frame, one row of YUY2 image bytes followed by the thermal bytes.
+        """
+        # Hotspot (about +40 C) circling the frame
+        angle = self.frame_count * 0.05
+        center_row = self.height / 2 + np.sin(angle) * self.height / 3
+        center_col = self.width / 2 + np.cos(angle) * self.width / 3
+        distance = (self._rows - center_row) ** 2 + (self._cols - center_col) ** 2
+        thermal = self._background + (2560 * np.exp(-distance / 50)).astype(np.uint16)
+        thermal += self._rng.integers(0, 32, thermal.shape, dtype=np.uint16)
+
+        # The camera's own image: luma from the thermal data, neutral chroma
+        yuv = np.empty((self.height, self.width, 2), dtype=np.uint8)
+        yuv[:, :, 0] = ((thermal - thermal.min()) >> 5).clip(0, 255)
+        yuv[:, :, 1] = 128
+
+        return np.concatenate((yuv.reshape(-1), thermal.astype("<u2").view(np.uint8).reshape(-1)))[np.newaxis, :]
+
+    def read(self):
+        if not self.isOpened():
+            return False, None
+
+        if self._frame is None or self.repeat_every <= 0 or self.frame_count % self.repeat_every:
+            self._frame = self._generate()
+        self.frame_count += 1
+
+        # Like a real capture, every read hands out a new array
+        return True, self._frame.copy()
+
+    def set(self, prop_id: int, value) -> bool:
+        return True
+
+    def get(self, prop_id: int) -> float:
+        return 0.0
+
+    def release(self):
+        self._is_open = False
@@ -7,12 +7,21 @@ Forked by Riley Meyerkorth on 17 January 2025 to modernize and clean up the prog
 """
 
 from argparse import ArgumentParser
-from defaults.values import VIDEO_DEVICE_INDEX
+from defaults.values import VIDEO_DEVICE_INDEX, METRICS_HOST, METRICS_FILE_NAME, MEDIA_OUTPUT_PATH
 from controllers.thermalcameracontroller import ThermalCameraController
+from controllers.playbackController import PlaybackController
 
 # Initialize argument parsing
 parser = ArgumentParser()
 parser.add_argument("--device", type=int, default=VIDEO_DEVICE_INDEX, help=f"VideoDevice index. Default is 0.")
+parser.add_argument("--playback", type=str, default=None,
+                    help="Play back a raw recording (.tcr) or archive (.tca) instead of using the camera.")
+parser.add_argument("--metrics-file", type=str, nargs="?", default=None,
+                    const=f"{MEDIA_OUTPUT_PATH}/{METRICS_FILE_NAME}",
+                    help=f"Periodically write capture metrics (Prometheus text format) to this file. "
+                         f"Without a path, writes {METRICS_FILE_NAME} to the media output directory.")
+parser.add_argument("--metrics-port", type=int, default=None,
+                    help=f"Serve capture metrics (Prometheus text format) over HTTP on {METRICS_HOST}:<port>.")
 args = parser.parse_args()
 
 
@@ -24,7 +33,13 @@ def main():
         dev = VIDEO_DEVICE_INDEX
         
     # Initialize the controller
-    c = ThermalCameraController(device_index=dev)
+    if args.playback:
+        c = PlaybackController(recording_path=args.playback)
+    else:
+        c = ThermalCameraController(
+            device_index=dev,
+            metrics_file=args.metrics_file,
+            metrics_port=args.metrics_port)
     
     # Print the credits and bindings
     c.print_credits()
@@ -0,0 +1,70 @@
+"""
+Long-running soak test of the capture loop. Drives the controller headless from a synthetic camera at maximum
+speed while sampling memory, allocations and open handles, then reports any growth trends.
+Exits with status 1 if growth was flagged, so the short --ci variant can gate builds.
+"""
+
+import shutil
+import sys
+import tempfile
+from argparse import ArgumentParser
+from defaults.values import *
+from controllers.soakController import SoakController
+from helpers.soakHelper import SoakMonitor
+
+# Initialize argument parsing
+parser = ArgumentParser(description="Soak test the capture loop with a synthetic camera.")
+parser.add_argument("--duration", type=float, default=None,
+                    help=f"Seconds to run. Default is {SOAK_DURATION:.0f} ({SOAK_CI_DURATION:.0f} with --ci).")
+parser.add_argument("--frames", type=int, default=None, help="Stop after this many frames instead.")
+parser.add_argument("--sample-interval", type=float, default=None,
+                    help=f"Seconds between resource samples. Default is {SOAK_SAMPLE_INTERVAL:g} "
+                         f"({SOAK_CI_SAMPLE_INTERVAL:g} with --ci).")
+parser.add_argument("--ci", action="store_true", help="Short CI-friendly run.")
+parser.add_argument("--no-tracemalloc", action="store_true",
+                    help="Skip tracemalloc (faster, but no per-allocator report).")
+parser.add_argument("--output", type=str, default=None,
+                    help="Directory for recordings and snapshots. Default is a temporary directory, removed after.")
+parser.add_argument("--keep-media", action="store_true",
+                    help="Keep every recording and snapshot instead of deleting each once finished "
+                         "(about 35 GB per hour).")
+parser.add_argument("--report", type=str, default=None, help="Also write the samples and trends to this JSON file.")
+args = parser.parse_args()
+
+
+def main():
+    duration = args.duration or (SOAK_CI_DURATION if args.ci else SOAK_DURATION)
+    sample_interval = args.sample_interval or (SOAK_CI_SAMPLE_INTERVAL if args.ci else SOAK_SAMPLE_INTERVAL)
+    output_path = args.output or tempfile.mkdtemp(prefix="thermal-soak-")
+
+    monitor = SoakMonitor(
+        expected_duration=0.0 if args.frames else duration,
+        sample_interval=sample_interval,
+        use_tracemalloc=not args.no_tracemalloc)
+    c = SoakController(
+        monitor=monitor,
+        duration=None if args.frames else duration,
+        max_frames=args.frames,
+        media_output_path=output_path,
+        keep_media=args.keep_media)
+
+    print(f'Soak testing for {f"{args.frames} frames" if args.frames else f"{duration:.0f} s"}, '
+          f'output in {output_path}')
+    monitor.start()
+    try:
+        c.run()
+    finally:
+        monitor.stop()
+        if args.output is None:
+            shutil.rmtree(output_path, ignore_errors=True)
+
+    print(monitor.report())
+    if args.report:
+        monitor.save_samples(args.report)
+
+    return 1 if monitor.get_flags() else 0
+
+
+# Basic main call
+if __name__ == '__main__':
+    sys.exit(main())